@@ -1,5 +1,87 @@
-from rest_framework.pagination import LimitOffsetPagination
+from collections import OrderedDict
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination)
+
 
 class DefaultLimitOffsetPagination(LimitOffsetPagination):
     default_limit = 20
-    max_limit = 200
\ No newline at end of file
+    max_limit = 200
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    DRF's cursor pagination: a page starts after the position where the
+    previous one ended (WHERE created_at > ...) instead of skipping all
+    earlier rows with an OFFSET, so deep pages are about as fast as the
+    first one. The view sets the ordering with a `cursor_ordering`
+    attribute. Only its first field is compared, rows that tie on it are
+    skipped with an OFFSET, and the other fields just make the order
+    stable. So the first field should be nearly unique and never change,
+    like a creation time.
+
+    Results aren't counted unless the `count=true` query parameter is given.
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 200
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        assert ordering is not None, (
+            "'%s' should include a `cursor_ordering` attribute."
+            % view.__class__.__name__
+        )
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        count = request.query_params.get(self.count_query_param, '')
+        if count.lower() == 'true':
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = OrderedDict([
+                ('count', self.count),
+                *response.data.items()
+            ])
+        return response
+
+
+class CursorOrLimitOffsetPagination(BasePagination):
+    """
+    Limit/offset pagination, unless the client opts into cursor pagination
+    with the `pagination=cursor` query parameter.
+    """
+    pagination_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.pagination_query_param) == 'cursor':
+            self.paginator = DefaultCursorPagination()
+        else:
+            self.paginator = DefaultLimitOffsetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return DefaultLimitOffsetPagination()\
+            .get_paginated_response_schema(schema)
+
+    def get_schema_fields(self, view):
+        return DefaultLimitOffsetPagination().get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return DefaultLimitOffsetPagination()\
+            .get_schema_operation_parameters(view)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
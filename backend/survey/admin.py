@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (Survey, SurveyQuestion, SurveyQuestionChoice,
-                     SurveySubmission, SurveyResponse, SurveySession)
+                     SurveySubmission, SurveyResponse, SurveySession,
+                     SurveySessionSummary)
 
 # Register your models here.
 
@@ -14,11 +15,39 @@ class SurveyAdmin(admin.ModelAdmin):
 class SurveyQuestionAdmin(admin.ModelAdmin):
     readonly_fields = ('id', )
 
+    # deleting questions changes the survey, saving them touches the survey
+    # through a post_save receiver
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        obj.survey.touch()
+
+    def delete_queryset(self, request, queryset):
+        surveys = list(
+            Survey.objects.filter(questions__in=queryset).distinct()
+        )
+        super().delete_queryset(request, queryset)
+        for survey in surveys:
+            survey.touch()
+
 
 @admin.register(SurveyQuestionChoice)
 class SurveyQuestionChoiceAdmin(admin.ModelAdmin):
     readonly_fields = ('id', )
 
+    # deleting choices changes the survey, saving them touches the survey
+    # through a post_save receiver
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        obj.question.survey.touch()
+
+    def delete_queryset(self, request, queryset):
+        surveys = list(
+            Survey.objects.filter(questions__choices__in=queryset).distinct()
+        )
+        super().delete_queryset(request, queryset)
+        for survey in surveys:
+            survey.touch()
+
 
 @admin.register(SurveySubmission)
 class SurveySubmissionAdmin(admin.ModelAdmin):
@@ -29,6 +58,37 @@ class SurveySubmissionAdmin(admin.ModelAdmin):
 class SurveyResponseAdmin(admin.ModelAdmin):
     readonly_fields = ('id', )
 
+    # responses are counted in their session's summary, which only follows
+    # submissions, so they can't be added or changed here. Deleting them
+    # (also done when deleting a submission, question, etc.) marks the
+    # summary stale and touches the survey to change the summary's version.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.responses_deleted([obj.session_id])
+
+    def delete_queryset(self, request, queryset):
+        session_ids = set(queryset.values_list('session_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.responses_deleted(session_ids)
+
+    @staticmethod
+    def responses_deleted(session_ids):
+        SurveySessionSummary.objects\
+            .filter(session_id__in=session_ids)\
+            .update(data=None)
+        surveys = Survey.objects\
+            .filter(surveysession__in=session_ids)\
+            .distinct()
+        for survey in surveys:
+            survey.touch()
+
+
 @admin.register(SurveySession)
 class SurveySessionAdmin(admin.ModelAdmin):
-    readonly_fields = ('id', )
\ No newline at end of file
+    readonly_fields = ('id', )
@@ -0,0 +1,85 @@
+import hashlib
+from django.core.cache import cache
+from django.db.models import Count, Max
+from .models import SurveySubmission
+from .utils import LRUCache
+
+# how long a session is cached by code. Other processes can't invalidate
+# their entries, and without a shared CACHES backend neither can they
+# invalidate their Django cache, so entries expire quickly in both.
+SESSION_CODE_TIMEOUT = 10
+
+# serialized sessions by code, in front of Django's cache
+_sessions_by_code = LRUCache(maxsize=1024, timeout=SESSION_CODE_TIMEOUT)
+
+
+def session_summary_version(session):
+    """
+    Returns a string that changes whenever the submission summary of a
+    session would change: when a submission is made or deleted and when
+    the survey or its questions are edited. Costs a single aggregate query.
+    """
+    submissions = SurveySubmission.objects\
+        .filter(session=session)\
+        .aggregate(count=Count('id'), latest=Max('submission_time'))
+    version = '|'.join(str(v) for v in [
+        session.id,
+        submissions['count'],
+        submissions['latest'],
+        session.survey.updated_at,
+    ])
+    return hashlib.sha1(version.encode('utf-8')).hexdigest()
+
+
+def summary_cache_key(version):
+    return f'survey:summary:{version}'
+
+
+def survey_schema_cache_key(survey):
+    return f'survey:schema:{survey.id}:{survey.updated_at.isoformat()}'
+
+
+def question_tree_cache_key(survey):
+    return f'survey:questions:{survey.id}:{survey.updated_at.isoformat()}'
+
+
+def join_cache_key(session):
+    """
+    The key of a session's join payload, which changes whenever the
+    session's survey or its questions are edited.
+    """
+    survey = session.survey
+    return f'survey:join:{session.id}:{survey.updated_at.isoformat()}'
+
+
+def session_code_cache_key(code):
+    return f'survey:code:{code}'
+
+
+def get_session_by_code(code, load):
+    """
+    Returns the serialized session with a code, from this process' cache or
+    Django's cache if possible. Otherwise load() is called to fetch it.
+    Exceptions raised by load() (e.g. Http404) aren't cached.
+    """
+    key = session_code_cache_key(code)
+    data = _sessions_by_code.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is None:
+            data = load()
+            cache.set(key, data, timeout=SESSION_CODE_TIMEOUT)
+        _sessions_by_code.set(key, data)
+    return data
+
+
+def invalidate_session_code(code):
+    """ Forgets the cached session with a code. """
+    key = session_code_cache_key(code)
+    _sessions_by_code.delete(key)
+    cache.delete(key)
+
+
+def clear_session_code_cache():
+    """ Forgets the sessions cached in this process. """
+    _sessions_by_code.clear()
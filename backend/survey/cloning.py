@@ -0,0 +1,92 @@
+from django.db import transaction
+from .models import Survey, SurveyQuestion, SurveyQuestionChoice
+from .utils import bulk_create_with_pks
+
+
+def copy_instance(instance, **values):
+    """
+    Returns an unsaved copy of a model instance without its primary key.
+    Fields can be overridden by their attribute names, e.g. survey_id=...
+    """
+    fields = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+    fields.update(values)
+    return instance.__class__(**fields)
+
+
+def clone_surveys(surveys, copies=1):
+    """
+    Copies surveys with all their questions and choices. The copies are
+    drafts and their group_by_question is the copy of the original's.
+
+    Returns {original survey id: [copies]}. Everything is copied in one
+    transaction with a fixed number of queries (no matter how many surveys,
+    questions or copies): one read each for questions and choices, one
+    bulk insert each for surveys, questions and choices and one bulk
+    update for group_by_question. Databases that don't return primary keys
+    from bulk inserts (SQLite before 3.35) save the copied surveys and
+    questions one at a time instead, see bulk_create_with_pks.
+    """
+    surveys = list(surveys)
+    if not surveys or copies < 1:
+        return {survey.id: [] for survey in surveys}
+
+    with transaction.atomic():
+        questions = list(
+            SurveyQuestion.objects
+            .filter(survey__in=surveys)
+            .order_by('id')
+            .prefetch_related('choices')
+        )
+
+        survey_copies = bulk_create_with_pks(Survey, [
+            copy_instance(survey, draft=True, group_by_question_id=None)
+            for survey in surveys
+            for _ in range(copies)
+        ])
+        # original survey id -> copies
+        clones = {
+            survey.id: survey_copies[i * copies:(i + 1) * copies]
+            for i, survey in enumerate(surveys)
+        }
+
+        question_copies = bulk_create_with_pks(SurveyQuestion, [
+            copy_instance(question, survey_id=survey_copy.id)
+            for question in questions
+            for survey_copy in clones[question.survey_id]
+        ])
+        # original question id -> copies, in the order of the survey copies
+        question_clones = {
+            question.id: question_copies[i * copies:(i + 1) * copies]
+            for i, question in enumerate(questions)
+        }
+
+        SurveyQuestionChoice.objects.bulk_create([
+            copy_instance(choice, question_id=question_copy.id)
+            for question in questions
+            for choice in question.choices.all()
+            for question_copy in question_clones[question.id]
+        ])
+
+        # point group_by_question to the copied questions
+        grouped = []
+        for survey in surveys:
+            if survey.group_by_question_id not in question_clones:
+                continue
+            for survey_copy, question_copy in zip(
+                clones[survey.id],
+                question_clones[survey.group_by_question_id]
+            ):
+                survey_copy.group_by_question = question_copy
+                grouped.append(survey_copy)
+        Survey.objects.bulk_update(grouped, ['group_by_question'])
+
+    return clones
+
+
+def duplicate_survey(survey):
+    """ Returns a draft copy of a survey, see clone_surveys. """
+    return clone_surveys([survey])[survey.id][0]
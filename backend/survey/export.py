@@ -0,0 +1,116 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import groupby
+from .models import SurveyQuestion, SurveySubmission
+
+
+class Echo:
+    """
+    An object that implements just the write method of the file-like
+    interface, so csv.writer can be used to build rows for streaming.
+    """
+
+    def write(self, value):
+        return value
+
+
+class SubmissionExporter:
+    """
+    Exports all submissions of a session, one row per submission with one
+    column per question.
+
+    Submissions and their responses are read with a single query through
+    a server-side cursor (QuerySet.iterator), so memory use doesn't depend
+    on the number of submissions.
+
+    Values are choice values for choice questions (lists of them for
+    checkboxes, and ordered by rank for ranking questions), the numeric
+    value for scale questions and the text for text questions.
+    """
+
+    chunk_size = 2000
+
+    def __init__(self, session):
+        self.session = session
+        self.questions = list(
+            SurveyQuestion.objects
+            .filter(survey=session.survey_id)
+            .order_by('number', 'id')
+            .prefetch_related('choices')
+        )
+        self.question_types = {q.id: q.type for q in self.questions}
+        self.choice_values = {
+            c.id: c.value for q in self.questions for c in q.choices.all()
+        }
+
+    def submissions(self):
+        """
+        Yields (submission id, submission time, {question id: value}).
+        """
+        rows = SurveySubmission.objects\
+            .filter(session=self.session)\
+            .order_by('submission_time', 'id', 'responses__id')\
+            .values_list(
+                'id', 'submission_time', 'responses__question',
+                'responses__choice', 'responses__text',
+                'responses__numeric_value'
+            )\
+            .iterator(chunk_size=self.chunk_size)
+
+        for (s_id, submission_time), responses in groupby(
+            rows, key=lambda row: row[:2]
+        ):
+            # question id -> [(numeric value, value)]
+            values = defaultdict(list)
+            for _, _, q_id, c_id, text, numeric_value in responses:
+                # a submission without responses
+                if q_id is None:
+                    continue
+                if c_id is not None:
+                    value = self.choice_values.get(c_id)
+                elif text is not None:
+                    value = text
+                else:
+                    value = numeric_value
+                values[q_id].append((numeric_value, value))
+            yield s_id, submission_time, {
+                q_id: self.format_value(q_id, question_values)
+                for q_id, question_values in values.items()
+            }
+
+    def format_value(self, question_id, values):
+        q_type = self.question_types.get(question_id)
+        if q_type == SurveyQuestion.QuestionType.RANKING:
+            return [value for _, value in sorted(values, key=lambda v: v[0])]
+        if q_type == SurveyQuestion.QuestionType.CHECKBOXES:
+            return [value for _, value in values]
+        return values[0][1]
+
+    def csv_rows(self):
+        """ Yields the lines of a CSV file with a header row. """
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ['id', 'submission_time'] + [q.title for q in self.questions]
+        )
+        for s_id, submission_time, values in self.submissions():
+            row = [str(s_id), submission_time.isoformat()]
+            for question in self.questions:
+                value = values.get(question.id)
+                if value is None:
+                    value = ''
+                elif isinstance(value, list):
+                    value = ';'.join(str(v) for v in value)
+                row.append(value)
+            yield writer.writerow(row)
+
+    def ndjson_rows(self):
+        """ Yields one JSON object per line. """
+        for s_id, submission_time, values in self.submissions():
+            yield json.dumps({
+                'id': str(s_id),
+                'submission_time': submission_time.isoformat(),
+                'responses': {
+                    str(q_id): value for q_id, value in values.items()
+                }
+            }) + '\n'
@@ -0,0 +1,159 @@
+"""
+Read-only serializers for the read-heavy endpoints (the questions list and
+the submissions list). They build the same output as
+NestedSurveyQuestionSerializer and NestedSurveySubmissionSerializer, but
+from .values() rows instead of model instances, and encode each distinct
+hashid once instead of once per field per row.
+
+Keep them in sync with the serializers in survey.serializers, the tests
+check that both produce the same output.
+"""
+from collections import defaultdict
+from django.db.models import ExpressionWrapper, F, IntegerField
+from rest_framework import serializers
+from .hashid_cache import encode_hashids
+from .models import SurveyQuestion, SurveyQuestionChoice, SurveyResponse
+from .serializers import (NestedSurveyQuestionSerializer,
+                          NestedSurveyResponseSerializer)
+
+QUESTION_FIELDS = ['number', 'title', 'required', 'type',
+                   'range_min', 'range_max', 'range_default', 'range_step']
+
+
+def raw_id(field_name):
+    """
+    Selects a (foreign key to a) hashid field as a plain integer, so the
+    field doesn't build a Hashid object for every row.
+    """
+    return ExpressionWrapper(F(field_name), output_field=IntegerField())
+
+
+def to_float(value):
+    return None if value is None else float(value)
+
+
+def serialize_choices(questions):
+    """
+    Returns {question id: [serialized choices]} for the questions in a
+    queryset, like NestedSurveyQuestionChoiceSerializer.
+    """
+    rows = SurveyQuestionChoice.objects\
+        .filter(question__in=questions.values('id'))\
+        .order_by('id')\
+        .values_list(raw_id('id'), raw_id('question'), 'value', 'description')
+    rows = list(rows)
+    hashids = encode_hashids(
+        SurveyQuestionChoice._meta.pk, [row[0] for row in rows]
+    )
+
+    choices = defaultdict(list)
+    for c_id, q_id, value, description in rows:
+        choices[q_id].append({
+            'id': hashids[c_id],
+            'value': value,
+            'description': description,
+        })
+    return choices
+
+
+def serialize_questions(questions):
+    """
+    Returns the questions in a queryset serialized like
+    NestedSurveyQuestionSerializer(questions, many=True).data, in the
+    queryset's order. Takes two queries, one for questions and one for
+    choices.
+    """
+    questions = questions.prefetch_related(None)
+    rows = list(questions.values_list(raw_id('id'), *QUESTION_FIELDS))
+    hashids = encode_hashids(SurveyQuestion._meta.pk, [row[0] for row in rows])
+    choices = serialize_choices(questions) if rows else {}
+
+    conditional_fields = NestedSurveyQuestionSerializer.conditional_fields
+    data = []
+    for (q_id, number, title, required, q_type,
+         range_min, range_max, range_default, range_step) in rows:
+        representation = {
+            'id': hashids[q_id],
+            'number': number,
+            'title': title,
+            'required': required,
+            'type': q_type,
+            'range_min': to_float(range_min),
+            'range_max': to_float(range_max),
+            'range_default': to_float(range_default),
+            'range_step': to_float(range_step),
+            'choices': choices.get(q_id, []),
+        }
+        for field, type_list in conditional_fields.items():
+            if q_type not in type_list:
+                representation.pop(field)
+        data.append(representation)
+    return data
+
+
+def serialize_responses(submission_ids):
+    """
+    Returns {submission id (integer): [serialized responses]} for the
+    given submission ids, like NestedSurveyResponseSerializer.
+    """
+    rows = SurveyResponse.objects\
+        .filter(submission__in=submission_ids)\
+        .order_by('id')\
+        .values_list(
+            raw_id('submission'), raw_id('question'), raw_id('choice'),
+            'text', 'numeric_value', 'question__type'
+        )
+    rows = list(rows)
+    question_hashids = encode_hashids(
+        SurveyQuestion._meta.pk, [row[1] for row in rows]
+    )
+    choice_hashids = encode_hashids(
+        SurveyQuestionChoice._meta.pk,
+        [row[2] for row in rows if row[2] is not None]
+    )
+    choice_hashids[None] = None
+
+    conditional_fields = NestedSurveyResponseSerializer.conditional_fields
+    responses = defaultdict(list)
+    for s_id, q_id, c_id, text, numeric_value, q_type in rows:
+        representation = {
+            'question': question_hashids[q_id],
+            'choice': choice_hashids[c_id],
+            'text': text,
+            'numeric_value': to_float(numeric_value),
+        }
+        for field, type_list in conditional_fields.items():
+            if q_type not in type_list:
+                representation.pop(field)
+        responses[s_id].append(representation)
+    return responses
+
+
+def submission_values(submissions):
+    """
+    The rows of a submission queryset serialize_submissions needs. Keeps
+    the `id` and `submission_time` keys so cursor pagination can use them.
+    """
+    return submissions.prefetch_related(None).values('id', 'submission_time')
+
+
+def serialize_submissions(rows):
+    """
+    Returns submissions serialized like
+    NestedSurveySubmissionSerializer(submissions, many=True).data, given
+    rows from submission_values (e.g. a page of them). Takes one query for
+    all responses.
+    """
+    rows = list(rows)
+    responses = serialize_responses([row['id'] for row in rows]) \
+        if rows else {}
+    submission_time = serializers.DateTimeField()
+    return [
+        {
+            'id': str(row['id']),
+            'submission_time':
+                submission_time.to_representation(row['submission_time']),
+            'responses': responses.get(row['id'].id, []),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,13 @@
+from hashid_field import HashidAutoField as BaseHashidAutoField
+from .hashid_cache import get_hashids
+
+
+class HashidAutoField(BaseHashidAutoField):
+    """
+    A HashidAutoField that encodes and decodes ids through the memoized
+    Hashids of its salt, see survey.hashid_cache.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hashids = get_hashids(self.salt, self.min_length, self.alphabet)
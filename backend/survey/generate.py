@@ -0,0 +1,97 @@
+"""
+Generated surveys of any size, for benchmarks and query count tests.
+"""
+from .models import (Survey, SurveyQuestion, SurveyQuestionChoice,
+                     SurveyResponse, SurveySession, SurveySubmission)
+from .utils import bulk_create_with_pks
+
+QuestionType = SurveyQuestion.QuestionType
+# the question types that have choices
+CHOICE_TYPES = (
+    QuestionType.MULTICHOICE,
+    QuestionType.CHECKBOXES,
+    QuestionType.DROPDOWN,
+    QuestionType.RANKING,
+)
+
+
+def generate_survey(question_count, submission_count, owner, code=10 ** 9):
+    """
+    Creates a survey with questions of every type and a session owned by
+    `owner` with submissions answering all of them. Returns the survey and
+    the session.
+    """
+    survey = Survey.objects.create(title='generated', draft=False)
+    session = SurveySession.objects.create(
+        survey=survey, owner=owner, code=code
+    )
+
+    types = list(QuestionType)
+    questions = bulk_create_with_pks(SurveyQuestion, [
+        SurveyQuestion(
+            survey=survey,
+            number=i + 1,
+            title=f'question {i + 1}',
+            required=True,
+            type=types[i % len(types)],
+            range_min=1.0,
+            range_max=5.0,
+            range_default=3.0,
+            range_step=1.0,
+        )
+        for i in range(question_count)
+    ])
+    choices = SurveyQuestionChoice.objects.bulk_create([
+        SurveyQuestionChoice(
+            question=question,
+            value=str(i),
+            description=f'choice {i}'
+        )
+        for question in questions
+        if question.type in CHOICE_TYPES
+        for i in range(1, 5)
+    ])
+    question_choices = {question.id: [] for question in questions}
+    for choice in choices:
+        question_choices.setdefault(choice.question_id, []).append(choice)
+
+    submissions = bulk_create_with_pks(SurveySubmission, [
+        SurveySubmission(session=session)
+        for _ in range(submission_count)
+    ])
+    SurveyResponse.objects.bulk_create(
+        [
+            response
+            for submission in submissions
+            for question in questions
+            for response in generate_responses(
+                submission, question, question_choices[question.id]
+            )
+        ],
+        batch_size=5000
+    )
+    return survey, session
+
+
+def generate_responses(submission, question, choices):
+    """ Returns unsaved responses of a submission to a question. """
+    fields = {
+        'submission': submission,
+        'session_id': submission.session_id,
+        'question': question,
+    }
+    if question.type == QuestionType.RANKING:
+        return [
+            SurveyResponse(choice=choice, numeric_value=rank, **fields)
+            for rank, choice in enumerate(choices, 1)
+        ]
+    if question.type == QuestionType.CHECKBOXES:
+        return [
+            SurveyResponse(choice=choice, **fields)
+            for choice in choices[:2]
+        ]
+    if question.type in (QuestionType.MULTICHOICE, QuestionType.DROPDOWN):
+        return [SurveyResponse(choice=choices[0], **fields)]
+    if question.type == QuestionType.SCALE:
+        return [SurveyResponse(numeric_value=4.0, **fields)]
+    return [SurveyResponse(text='some text', **fields)]
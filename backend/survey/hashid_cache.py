@@ -0,0 +1,105 @@
+"""
+Memoized hashid encoding and decoding.
+
+Every id read from or written to the database goes through the Hashids
+algorithm, which shuffles the alphabet for each character. The same ids
+(questions, choices, sessions) come up over and over, so the hashid fields
+of survey.models encode and decode through a MemoizedHashids, one per salt,
+that remembers recent results.
+"""
+from django.apps import apps
+from hashids import Hashids
+from .utils import LRUCache
+
+# number of encoded and decoded ids remembered per salt
+CACHE_SIZE = 8192
+
+
+class MemoizedHashids(Hashids):
+    """ Hashids that remember the most recently encoded and decoded ids. """
+
+    def __init__(self, salt='', min_length=0, alphabet=Hashids.ALPHABET,
+                 maxsize=CACHE_SIZE):
+        super().__init__(salt=salt, min_length=min_length, alphabet=alphabet)
+        # (id, ...) -> hashid
+        self.encoded = LRUCache(maxsize=maxsize)
+        # hashid -> (id, ...)
+        self.decoded = LRUCache(maxsize=maxsize)
+
+    def encode(self, *values):
+        hashid = self.encoded.get(values)
+        if hashid is None:
+            hashid = super().encode(*values)
+            self.encoded.set(values, hashid)
+        return hashid
+
+    def decode(self, hashid):
+        values = self.decoded.get(hashid)
+        if values is None:
+            values = super().decode(hashid)
+            self.decoded.set(hashid, values)
+        return values
+
+    def encode_many(self, ids):
+        """ Returns {id: hashid} for integer ids, encoding each once. """
+        return {id: self.encode(id) for id in set(ids)}
+
+    def stats(self):
+        return {
+            'encode': self.encoded.stats(),
+            'decode': self.decoded.stats(),
+        }
+
+
+# (salt, min_length, alphabet) -> MemoizedHashids
+_hashids = {}
+
+
+def get_hashids(salt, min_length, alphabet):
+    """
+    Returns the MemoizedHashids for a salt, min_length and alphabet, so
+    fields that share a salt share a cache.
+    """
+    key = (salt, min_length, alphabet)
+    if key not in _hashids:
+        _hashids[key] = MemoizedHashids(
+            salt=salt, min_length=min_length, alphabet=alphabet
+        )
+    return _hashids[key]
+
+
+def encode_hashids(field, ids):
+    """
+    Returns {id: hashid string} for integer ids of a hashid field (e.g.
+    SurveyQuestion._meta.pk). Each distinct id is encoded once, without
+    building the Hashid objects the field would build for every row.
+    """
+    hashids = field._hashids
+    if isinstance(hashids, MemoizedHashids):
+        encoded = hashids.encode_many(ids)
+    else:
+        encoded = {id: hashids.encode(id) for id in set(ids)}
+    if field.prefix:
+        encoded = {id: field.prefix + h for id, h in encoded.items()}
+    return encoded
+
+
+def hashid_cache_stats():
+    """
+    Returns {model label: {'encode': stats, 'decode': stats}} for the
+    models whose primary keys use a MemoizedHashids, see LRUCache.stats.
+    """
+    return {
+        model._meta.label: model._meta.pk._hashids.stats()
+        for model in apps.get_models()
+        if isinstance(getattr(model._meta.pk, '_hashids', None),
+                      MemoizedHashids)
+    }
+
+
+def clear_hashid_cache():
+    """ Forgets the memoized ids and resets the hit counts. """
+    for hashids in _hashids.values():
+        for cache in (hashids.encoded, hashids.decoded):
+            cache.clear()
+            cache.reset_stats()
@@ -0,0 +1,95 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from survey.fast_serializers import (serialize_questions,
+                                     serialize_submissions, submission_values)
+from survey.generate import generate_survey
+from survey.hashid_cache import clear_hashid_cache, hashid_cache_stats
+from survey.models import SurveyQuestion, SurveySubmission
+from survey.serializers import (NestedSurveyQuestionSerializer,
+                                NestedSurveySubmissionSerializer)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the speed of the DRF serializers and the fast serializers "
+        "(survey.fast_serializers) on generated questions and submissions, "
+        "and checks that both render the same JSON. The generated data is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--questions', type=int, default=50,
+            help='Number of questions to generate.'
+        )
+        parser.add_argument(
+            '--submissions', type=int, default=200,
+            help='Number of submissions to generate.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of times each serializer runs; the best time counts.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            survey, session = generate_survey(
+                options['questions'], options['submissions'],
+                User.objects.create_user('benchmark_serializers')
+            )
+
+            questions = SurveyQuestion.objects.filter(survey=survey)
+            self.compare(
+                'questions', options['repeat'],
+                lambda: NestedSurveyQuestionSerializer(
+                    questions.prefetch_related('choices'), many=True
+                ).data,
+                lambda: serialize_questions(questions)
+            )
+
+            submissions = SurveySubmission.objects.filter(session=session)
+            self.compare(
+                'submissions', options['repeat'],
+                lambda: NestedSurveySubmissionSerializer(
+                    submissions.prefetch_related(
+                        'responses', 'responses__question'
+                    ),
+                    many=True
+                ).data,
+                lambda: serialize_submissions(submission_values(submissions))
+            )
+
+            transaction.set_rollback(True)
+
+    def compare(self, name, repeat, serialize, fast_serialize):
+        renderer = JSONRenderer()
+        clear_hashid_cache()
+        slow_time, data = self.time(serialize, repeat)
+        fast_time, fast_data = self.time(fast_serialize, repeat)
+        if renderer.render(data) != renderer.render(fast_data):
+            raise CommandError(f'{name}: the outputs differ.')
+        self.stdout.write(
+            f'{name}: {slow_time * 1000:.1f}ms -> {fast_time * 1000:.1f}ms '
+            f'({slow_time / fast_time:.1f}x)'
+        )
+        for label, stats in hashid_cache_stats().items():
+            encode = stats['encode']
+            if encode['hit_rate'] is not None:
+                self.stdout.write(
+                    f"  {label} hashid cache: {encode['hit_rate']:.1%} of "
+                    f"{encode['hits'] + encode['misses']} encodes hit"
+                )
+
+    def time(self, func, repeat):
+        """ Returns the best time of `repeat` runs and the result. """
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        return best, result
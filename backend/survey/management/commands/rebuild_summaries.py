@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from survey.models import SurveySession, SurveySessionSummary
+from survey.summarizer import (MaterializedSubmissionSummarizer,
+                               SubmissionSummarizer)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the materialized summaries (SurveySessionSummary) of "
+        "survey sessions and checks that they match summaries computed "
+        "from the responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'session_ids', nargs='*',
+            help='Ids of the sessions to rebuild. Defaults to all sessions.'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only check the existing summaries, without rebuilding them.'
+        )
+
+    def handle(self, *args, **options):
+        sessions = SurveySession.objects.select_related('survey')
+        if options['session_ids']:
+            sessions = sessions.filter(pk__in=options['session_ids'])
+
+        mismatches = []
+        for session in sessions:
+            submissions = session.submissions.all()
+
+            if options['check']:
+                matches = self.check_summary(session, submissions)
+            else:
+                # stale summaries are rebuilt by the summarizer
+                SurveySessionSummary.objects\
+                    .filter(session=session)\
+                    .update(data=None)
+                matches = MaterializedSubmissionSummarizer(
+                    session, submissions
+                ).data == SubmissionSummarizer(session, submissions).data
+
+            if matches:
+                self.stdout.write(f'{session}: ok')
+            else:
+                mismatches.append(session)
+                self.stderr.write(f'{session}: summary does not match')
+
+        if mismatches:
+            raise CommandError(
+                f'{len(mismatches)} summaries do not match.'
+            )
+
+    def check_summary(self, session, submissions):
+        """
+        Compares the stored summary with a summary computed from the
+        responses. A missing or stale summary doesn't match, and isn't
+        built.
+        """
+        summary = SurveySessionSummary.objects\
+            .filter(session=session).first()
+        if summary is None or summary.data is None \
+                or summary.group_by_question_id \
+                != session.survey.group_by_question_id:
+            return False
+
+        # the summary is up to date, so the summarizer only reads it
+        return MaterializedSubmissionSummarizer(
+            session, submissions
+        ).data == SubmissionSummarizer(session, submissions).data
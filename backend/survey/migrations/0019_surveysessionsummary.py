@@ -0,0 +1,22 @@
+# Generated by Django 4.0.1 on 2026-10-17 11:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0018_alter_surveysubmission_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySessionSummary',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='survey.surveysession')),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('group_by_question', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='survey.surveyquestion')),
+            ],
+        ),
+    ]
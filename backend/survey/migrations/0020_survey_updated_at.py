@@ -0,0 +1,20 @@
+# Generated by Django 4.0.1 on 2026-10-17 12:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0019_surveysessionsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
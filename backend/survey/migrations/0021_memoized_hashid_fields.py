@@ -0,0 +1,39 @@
+# Generated by Django 4.0.1 on 2026-10-17 12:02
+
+from django.db import migrations
+import survey.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0020_survey_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='survey',
+            name='id',
+            field=survey.fields.HashidAutoField(alphabet='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890', min_length=7, prefix='', primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='surveyquestion',
+            name='id',
+            field=survey.fields.HashidAutoField(alphabet='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890', min_length=7, prefix='', primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='surveyquestionchoice',
+            name='id',
+            field=survey.fields.HashidAutoField(alphabet='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890', min_length=7, prefix='', primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='surveysession',
+            name='id',
+            field=survey.fields.HashidAutoField(alphabet='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890', min_length=7, prefix='', primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='surveysubmission',
+            name='id',
+            field=survey.fields.HashidAutoField(alphabet='abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890', min_length=7, prefix='', primary_key=True, serialize=False),
+        ),
+    ]
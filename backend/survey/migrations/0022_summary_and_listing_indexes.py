@@ -0,0 +1,25 @@
+# Generated by Django 4.0.1 on 2026-10-17 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0021_memoized_hashid_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['created_at', 'id'], name='survey_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyquestion',
+            index=models.Index(fields=['survey', 'number'], name='question_survey_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveysubmission',
+            index=models.Index(fields=['session', 'submission_time'], name='submission_session_time_idx'),
+        ),
+    ]
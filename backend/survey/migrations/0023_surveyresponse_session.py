@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_submission_sessions(apps, schema_editor):
+    SurveyResponse = apps.get_model('survey', 'SurveyResponse')
+    SurveySubmission = apps.get_model('survey', 'SurveySubmission')
+    SurveyResponse.objects.update(session=Subquery(
+        SurveySubmission.objects
+        .filter(pk=OuterRef('submission'))
+        .values('session')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0022_summary_and_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='session',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='survey.surveysession'),
+        ),
+        migrations.RunPython(
+            copy_submission_sessions, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='surveyresponse',
+            name='session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='survey.surveysession'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresponse',
+            index=models.Index(fields=['session', 'question', 'choice', 'numeric_value'], name='response_session_question_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from hashid_field import HashidAutoField
+from .fields import HashidAutoField
 from .utils import build_auto_salt
 from django.core.validators import MinValueValidator
 from django.dispatch import receiver
@@ -22,14 +23,30 @@ class Survey(models.Model):
         related_name="group_survey"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # also updated when questions or choices of the survey change
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'Survey id={self.id} title={self.title!r}'
 
+    def touch(self):
+        """ Marks the survey as modified, e.g. after editing its questions. """
+        self.updated_at = timezone.now()
+        Survey.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+
     @property
     def required_questions(self):
         return self.questions.filter(required=True)
 
+    class Meta:
+        indexes = [
+            # surveys are paged through by creation time
+            models.Index(
+                fields=['created_at', 'id'],
+                name='survey_created_at_idx'
+            ),
+        ]
+
 
 class SurveySession(models.Model):
     # Let's have an id field because the code might be reused.
@@ -119,6 +136,15 @@ class SurveyQuestion(models.Model):
             SurveyQuestion.QuestionType.RANKING.value,
         ]
 
+    class Meta:
+        indexes = [
+            # questions are listed and exported by number
+            models.Index(
+                fields=['survey', 'number'],
+                name='question_survey_number_idx'
+            ),
+        ]
+
 
 class SurveyQuestionChoice(models.Model):
 
@@ -154,6 +180,15 @@ class SurveySubmission(models.Model):
     def __str__(self):
         return f'SurveySubmission id={self.id} session={self.session.id}'
 
+    class Meta:
+        indexes = [
+            # submissions are paged through by submission time
+            models.Index(
+                fields=['session', 'submission_time'],
+                name='submission_session_time_idx'
+            ),
+        ]
+
 
 class SurveyResponse(models.Model):
 
@@ -162,6 +197,13 @@ class SurveyResponse(models.Model):
         on_delete=models.CASCADE,
         related_name='responses'
     )
+    # the submission's session, so the responses of a session can be
+    # aggregated without joining SurveySubmission
+    session = models.ForeignKey(
+        SurveySession,
+        on_delete=models.CASCADE,
+        related_name='responses'
+    )
     question = models.ForeignKey(
         SurveyQuestion,
         on_delete=models.CASCADE,
@@ -178,3 +220,45 @@ class SurveyResponse(models.Model):
 
     def __str__(self):
         return f'SurveyResponse submission={self.submission.id} question={self.question.id}'
+
+    def save(self, *args, **kwargs):
+        if self.session_id is None:
+            self.session_id = self.submission.session_id
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # covers the session's response counts
+            models.Index(
+                fields=['session', 'question', 'choice', 'numeric_value'],
+                name='response_session_question_idx'
+            ),
+        ]
+
+
+class SurveySessionSummary(models.Model):
+    """
+    Response counts of a session, updated whenever a submission is made
+    or deleted so that summaries don't have to be computed from scratch.
+    See survey.stats and survey.summarizer.
+    """
+
+    session = models.OneToOneField(
+        SurveySession,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+    # the group_by_question the counts were grouped by
+    group_by_question = models.ForeignKey(
+        SurveyQuestion,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    # None if the counts need to be rebuilt
+    data = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f'SurveySessionSummary session={self.session_id}'
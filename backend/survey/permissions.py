@@ -1,4 +1,5 @@
-from rest_framework.permissions import BasePermission
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
 class IsAuthenticatedOrCreateOnly(BasePermission):
@@ -12,3 +13,50 @@ class IsAuthenticatedOrCreateOnly(BasePermission):
             request.user and
             request.user.is_authenticated
         )
+
+
+class IsParentOwner(BasePermission):
+    """
+    The request user owns the parent object of a nested view.
+
+    The owner's id is read from view.parent_instance (see
+    NestedViewMixIn.get_parent_owner_id), so checking doesn't query the
+    database. Views whose parent has no owner are not restricted.
+    """
+    message = _("You don't have permission to access this resource.")
+
+    def has_permission(self, request, view):
+        if view.parent_owner_field is None:
+            return True
+        return bool(
+            request.user and
+            request.user.is_authenticated and
+            view.get_parent_owner_id() == request.user.id
+        )
+
+
+class IsParentOwnerOrCreateOnly(IsParentOwner):
+    """
+    The request user owns the parent object of a nested view, or the
+    request is a create request.
+    """
+
+    def has_permission(self, request, view):
+        return (
+            request.method in ['POST', 'OPTIONS'] or
+            super().has_permission(request, view)
+        )
+
+
+class IsOwnerOrReadOnly(BasePermission):
+    """
+    The request user owns the object (through its `owner` foreign key), or
+    the request is a read only request.
+    """
+    message = _("You don't have permission to edit this resource.")
+
+    def has_object_permission(self, request, view, obj):
+        return bool(
+            request.method in SAFE_METHODS or
+            obj.owner_id == request.user.id
+        )
@@ -0,0 +1,26 @@
+from django.core.cache import cache
+from .cache import question_tree_cache_key
+from .fast_serializers import serialize_questions
+from .models import SurveyQuestion
+
+
+def get_question_tree(survey):
+    """
+    Returns a survey's questions with their choices, serialized like
+    NestedSurveyQuestionSerializer would (see survey.fast_serializers).
+
+    The questions of published surveys are cached without a timeout. The
+    cache key includes the survey's updated_at, so editing the survey or
+    its questions (or making it a draft again) invalidates the cache.
+    """
+    if not survey.draft:
+        cache_key = question_tree_cache_key(survey)
+        data = cache.get(cache_key)
+        if data is not None:
+            return data
+
+    data = serialize_questions(SurveyQuestion.objects.filter(survey=survey))
+
+    if not survey.draft:
+        cache.set(cache_key, data, timeout=None)
+    return data
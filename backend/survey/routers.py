@@ -0,0 +1,14 @@
+from rest_framework_nested import routers
+
+
+class NestedBulkRouter(routers.NestedSimpleRouter):
+    """
+    A NestedSimpleRouter that also routes PUT requests to a list url
+    (e.g. /api/surveys/<survey_id>/questions/) to the viewset's `replace`
+    method, for viewsets that have one.
+    """
+    routes = [
+        route._replace(mapping={**route.mapping, 'put': 'replace'})
+        if route.name == '{basename}-list' else route
+        for route in routers.NestedSimpleRouter.routes
+    ]
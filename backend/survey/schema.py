@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from .cache import survey_schema_cache_key
+from .models import SurveyQuestion
+from .utils import LRUCache
+
+
+class ChoiceSchema:
+    """ What validating a response needs to know about a choice. """
+
+    def __init__(self, choice):
+        self.id = choice.id
+        self.question_id = choice.question_id
+
+
+class QuestionSchema:
+    """ What validating a response needs to know about a question. """
+
+    def __init__(self, question):
+        self.id = question.id
+        self.type = question.type
+        self.required = question.required
+        self.range_min = question.range_min
+        self.range_max = question.range_max
+        self.min_responses = question.min_responses
+        self.max_responses = question.max_responses
+
+
+class SurveySchema:
+    """
+    The rules submissions to a survey are validated against, compiled
+    from its questions and choices so that validating a submission doesn't
+    need any queries. Use get_survey_schema to get a cached schema.
+    """
+
+    def __init__(self, survey):
+        questions = list(
+            SurveyQuestion.objects
+            .filter(survey=survey)
+            .prefetch_related('choices')
+        )
+        self.survey_id = survey.id
+        # question id -> QuestionSchema
+        self.questions = {q.id: QuestionSchema(q) for q in questions}
+        # choice id -> ChoiceSchema
+        self.choices = {
+            c.id: ChoiceSchema(c) for q in questions for c in q.choices.all()
+        }
+
+
+# compiled schemas of recently used surveys in this process
+_schemas = LRUCache(maxsize=256)
+
+
+def get_survey_schema(survey):
+    """
+    Returns the SurveySchema of a survey, from this process' cache or
+    Django's cache if possible.
+
+    Schemas are cached per version of the survey (updated_at), which
+    changes whenever its questions or choices do, so an edited survey
+    never gets a stale schema. Published surveys aren't expected to
+    change, so their schemas are cached without a timeout.
+    """
+    key = survey_schema_cache_key(survey)
+    schema = _schemas.get(key)
+    if schema is None:
+        schema = cache.get(key)
+        if schema is None:
+            schema = SurveySchema(survey)
+            timeout = DEFAULT_TIMEOUT if survey.draft else None
+            cache.set(key, schema, timeout=timeout)
+        _schemas.set(key, schema)
+    return schema
+
+
+def clear_schema_cache():
+    """ Forgets the schemas cached in this process. """
+    _schemas.clear()
@@ -1,10 +1,14 @@
 from rest_framework import serializers
 from hashid_field.rest import HashidSerializerCharField
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.utils.translation import gettext_lazy as _
 from collections import defaultdict
 from .models import (Survey, SurveyQuestion, SurveyQuestionChoice,
                      SurveyResponse, SurveySubmission, Survey, SurveySession)
-from .validators import OwnedByRequestUser
+from .schema import get_survey_schema
+from .stats import update_session_summary
+from .utils import bulk_create_with_pks
 
 
 class SerializerContextDefault:
@@ -60,6 +64,47 @@ class SurveySerializer(serializers.ModelSerializer):
         return question
 
 
+class SurveyCloneSerializer(serializers.Serializer):
+    """
+    Validates a request to clone surveys: a list of survey ids and the
+    number of copies to make of each.
+    """
+    max_surveys = 100
+    # all copies are made in one transaction, which blocks other writes
+    # (e.g. submissions) on SQLite while it runs
+    max_total_copies = 1500
+
+    surveys = serializers.ListField(
+        child=HashidSerializerCharField(source_field='survey.Survey.id'),
+        allow_empty=False,
+        max_length=max_surveys
+    )
+    copies = serializers.IntegerField(min_value=1, max_value=100, default=1)
+
+    def validate_surveys(self, survey_ids):
+        """
+        Replace the ids with the surveys, fetched with one query.
+        """
+        # drop duplicate ids but keep the order
+        survey_ids = list(dict.fromkeys(survey_ids))
+        surveys = Survey.objects.in_bulk(survey_ids)
+        missing = [str(s_id) for s_id in survey_ids if s_id not in surveys]
+        if missing:
+            raise serializers.ValidationError(
+                "Surveys {ids} don't exist.".format(ids=','.join(missing))
+            )
+        return [surveys[s_id] for s_id in survey_ids]
+
+    def validate(self, data):
+        total = len(data['surveys']) * data['copies']
+        if total > self.max_total_copies:
+            raise serializers.ValidationError(
+                "Can't make more than {max} copies at once ({total} requested)."
+                .format(max=self.max_total_copies, total=total)
+            )
+        return data
+
+
 class NestedSurveyQuestionChoiceSerializer(serializers.ModelSerializer):
     # can't be readonly because we need the id for updating choices
     id = HashidSerializerCharField(
@@ -79,8 +124,7 @@ class NestedSurveyQuestionSerializer(serializers.ModelSerializer):
     survey = serializers.HiddenField(
         default=SerializerContextDefault(
             lambda context: context['view'].parent_instance
-        ),
-        validators=[OwnedByRequestUser()]
+        )
     )
     choices = NestedSurveyQuestionChoiceSerializer(many=True, required=False)
 
@@ -167,60 +211,246 @@ class NestedSurveyQuestionSerializer(serializers.ModelSerializer):
         Create the SurveyQuestion and its SurveyQuestionChoices.
         """
         choices = validated_data.pop('choices', [])
-        question = super().create(validated_data)
-        for choice_data in choices:
-            # remove the id if exists - id will be auto created
-            choice_data.pop('id', None)
-            SurveyQuestionChoice.objects.create(
-                question=question, **choice_data
-            )
+        with transaction.atomic():
+            question = super().create(validated_data)
+            for choice_data in choices:
+                # remove the id if exists - id will be auto created
+                choice_data.pop('id', None)
+            SurveyQuestionChoice.objects.bulk_create([
+                SurveyQuestionChoice(question=question, **choice_data)
+                for choice_data in choices
+            ])
         return question
 
     def update(self, instance, validated_data):
         """
         Update the SurveyQuestion and its SurveyQuestionChoices.
+
+        The new choices are diffed against the existing ones (see
+        ChoiceChanges) and only the choices that changed are written.
         """
 
         choices = validated_data.pop('choices', [])
+        changes = ChoiceChanges()
+        changes.diff(instance, instance.choices.all(), choices)
+
+        with transaction.atomic():
+            changes.apply()
+
+            # update the SurveyQuestion instance
+            super().update(instance, validated_data)
+
+        return instance
+
+
+class ChoiceChanges:
+    """
+    Changes to the choices of questions, found by comparing their existing
+    choices with the choices they should have. The changes of any number
+    of questions are applied with one bulk_update for changed choices,
+    one DELETE for removed ones and one bulk_create for new ones.
+    """
+
+    def __init__(self):
+        self.changed = []
+        self.changed_fields = set()
+        self.deleted_ids = []
+        self.created = []
+
+    def diff(self, question, choices, choices_data):
+        """
+        Compares a question's existing choices with validated choices
+        data. Existing choices are modified in place.
+        """
 
         # If a choice already has an id, we will update it with the new values.
         # We should create new choices for those in the list that have no id.
-        create_choices = []
         update_choices = {}
-        for choice in choices:
-            if 'id' in choice:
-                update_choices[choice['id']] = choice
+        for choice_data in choices_data:
+            if 'id' in choice_data:
+                update_choices[choice_data['id']] = choice_data
             else:
-                create_choices.append(choice)
+                self.created.append(
+                    SurveyQuestionChoice(question=question, **choice_data)
+                )
 
-        for choice in instance.choices.all():
+        for choice in choices:
             if choice.id in update_choices:
+                changed = False
                 for attr, value in update_choices[choice.id].items():
-                    setattr(choice, attr, value)
-                choice.save()
+                    if getattr(choice, attr) != value:
+                        setattr(choice, attr, value)
+                        self.changed_fields.add(attr)
+                        changed = True
+                if changed:
+                    self.changed.append(choice)
             else:
                 # remove those not in the update list
-                choice.delete()
+                self.deleted_ids.append(choice.id)
+
+    def apply(self):
+        """ Writes the changes, call it in a transaction. """
+        if self.deleted_ids:
+            SurveyQuestionChoice.objects\
+                .filter(id__in=self.deleted_ids)\
+                .delete()
+        if self.changed:
+            SurveyQuestionChoice.objects.bulk_update(
+                self.changed, sorted(self.changed_fields)
+            )
+        SurveyQuestionChoice.objects.bulk_create(self.created)
+
+
+class BulkSurveyQuestionListSerializer(serializers.ListSerializer):
+    """
+    Replaces all questions of a survey with a list of questions. The
+    instance is the queryset of the survey's questions (with their
+    choices prefetched).
+    """
+
+    def validate(self, data):
+        existing_ids = {question.id for question in self.instance}
+        seen_ids = set()
+        for question_data in data:
+            if 'id' not in question_data:
+                continue
+            question_id = question_data['id']
+            if question_id not in existing_ids:
+                raise serializers.ValidationError(
+                    f'Question {question_id} is not a question of this survey.'
+                )
+            if question_id in seen_ids:
+                raise serializers.ValidationError(
+                    f'Question {question_id} is included more than once.'
+                )
+            seen_ids.add(question_id)
+        return data
 
-        for choice_data in create_choices:
-            SurveyQuestionChoice.objects.create(
-                question=instance, **choice_data)
+    def update(self, instance, validated_data):
+        """
+        Questions with an id update the existing question, the others are
+        new and existing questions left out are deleted. Choices are
+        updated like in NestedSurveyQuestionSerializer.update.
 
-        # update the SurveyQuestion instance
-        super().update(instance, validated_data)
+        Takes a constant number of queries no matter how many questions
+        and choices there are, unless the database doesn't return primary
+        keys from bulk inserts (see bulk_create_with_pks).
+        """
+        existing = {question.id: question for question in instance}
+
+        changed_questions = []
+        changed_fields = set()
+        created_questions = []
+        choice_changes = ChoiceChanges()
+        for question_data in validated_data:
+            choices = question_data.pop('choices', [])
+            question_id = question_data.pop('id', None)
+            survey = question_data.pop('survey')
+            if question_id is None:
+                question = SurveyQuestion(survey=survey, **question_data)
+                created_questions.append(question)
+                choice_changes.diff(question, [], choices)
+                continue
+
+            question = existing.pop(question_id)
+            changed = False
+            for attr, value in question_data.items():
+                if getattr(question, attr) != value:
+                    setattr(question, attr, value)
+                    changed_fields.add(attr)
+                    changed = True
+            if changed:
+                changed_questions.append(question)
+            choice_changes.diff(question, question.choices.all(), choices)
+
+        with transaction.atomic():
+            if existing:
+                # remove those not in the list
+                SurveyQuestion.objects.filter(id__in=existing.keys()).delete()
+            if changed_questions:
+                SurveyQuestion.objects.bulk_update(
+                    changed_questions, sorted(changed_fields)
+                )
+            # the choices of new questions need their ids
+            bulk_create_with_pks(SurveyQuestion, created_questions)
+            choice_changes.apply()
 
         return instance
 
 
+class BulkSurveyQuestionSerializer(NestedSurveyQuestionSerializer):
+    # the id of the question to update, new questions don't have one
+    id = HashidSerializerCharField(
+        source_field='survey.SurveyQuestion.id',
+        required=False
+    )
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # questions are validated as new questions, the queryset being
+        # replaced is only given to the list serializer
+        kwargs['child'] = cls(context=kwargs.get('context', {}))
+        return BulkSurveyQuestionListSerializer(*args, **kwargs)
+
+
+def survey_schema_from_context(context):
+    """
+    Returns the SurveySchema of the session being submitted to. It's looked
+    up the first time it's needed and kept in the serializer context.
+    """
+    if 'survey_schema' not in context:
+        session = context['view'].parent_instance
+        context['survey_schema'] = get_survey_schema(session.survey)
+    return context['survey_schema']
+
+
+class LookupRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField that finds objects in a {pk: object} dict
+    returned by get_objects(context) instead of querying the database.
+    """
+
+    def __init__(self, get_objects, **kwargs):
+        self.get_objects = get_objects
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        objects = self.get_objects(self.context)
+        # hashids compare equal to their string, so known hashids can be
+        # found without decoding them
+        if isinstance(data, str) and data in objects:
+            return objects[data]
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            return objects[data]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except TypeError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+def schema_questions(context):
+    return survey_schema_from_context(context).questions
+
+
+def schema_choices(context):
+    return survey_schema_from_context(context).choices
+
+
 class NestedSurveyResponseSerializer(serializers.ModelSerializer):
 
-    question = serializers.PrimaryKeyRelatedField(
+    # questions and choices are looked up in the survey's SurveySchema, so
+    # ones belonging to other surveys are rejected as nonexistent here
+    question = LookupRelatedField(
+        get_objects=schema_questions,
         pk_field=HashidSerializerCharField(
             source_field='survey.SurveyQuestion.id'
         ),
         queryset=SurveyQuestion.objects.all()
     )
-    choice = serializers.PrimaryKeyRelatedField(
+    choice = LookupRelatedField(
+        get_objects=schema_choices,
         pk_field=HashidSerializerCharField(
             source_field='survey.SurveyQuestionChoice.id'
         ),
@@ -279,7 +509,7 @@ class NestedSurveyResponseSerializer(serializers.ModelSerializer):
         if 'choice' in data:
             # make sure that the choice is valid for the question
             # if we want to set/update either (or both)
-            if data['choice'].question != question:
+            if data['choice'].question_id != question.id:
                 raise serializers.ValidationError(
                     {'choice': f'Invalid choice for question {question.id}'}
                 )
@@ -318,8 +548,9 @@ class NestedSurveySubmissionSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         """
-        Make sure all responses are associated with the given survey and
-        all required questions are answered.
+        Make sure choices are unique and every question of the survey has an
+        acceptable number of responses. Questions and choices of other surveys
+        are already rejected by the response fields.
         """
 
         existing_choices = set()
@@ -339,7 +570,8 @@ class NestedSurveySubmissionSerializer(serializers.ModelSerializer):
                 else:
                     existing_choices.add(response['choice'].id)
 
-        for question in data['session'].survey.questions.all():
+        schema = survey_schema_from_context(self.context)
+        for question in schema.questions.values():
             # number of responses for current question
             response_count = question_response_count[question.id]
 
@@ -367,31 +599,74 @@ class NestedSurveySubmissionSerializer(serializers.ModelSerializer):
                         )
                     )
 
-            question_response_count.pop(question.id)
-
-        # check for questions that don't belong to the given survey
-        if len(question_response_count) > 0:
-            question_ids = question_response_count.keys()
-            raise serializers.ValidationError(
-                _("Questions {q_ids} are invalid for survey {s_id}.").format(
-                    q_ids=','.join(str(q.id) for q in question_ids),
-                    s_id=data['survey'].id
-                )
-            )
-
         return data
 
     def create(self, validated_data):
         """
-        Create the SurveySubmission and its SurveyResponses.
+        Create the SurveySubmission and its SurveyResponses, and add the
+        responses to the session's summary.
         """
         responses = validated_data.pop('responses', [])
-        submission = super().create(validated_data)
-        for response_data in responses:
-            SurveyResponse.objects.create(
-                submission=submission, **response_data)
+        with transaction.atomic():
+            submission = super().create(validated_data)
+            self.create_responses(submission.session, [(submission, responses)])
+        # fetch the responses with their questions for to_representation
+        prefetch_related_objects([submission], 'responses__question')
         return submission
 
+    def create_many(self, validated_items):
+        """
+        Create SurveySubmissions and their SurveyResponses from a list of
+        validated data (all for the same session) with a fixed number of
+        queries. Databases that don't return primary keys from bulk inserts
+        (SQLite before 3.35) save the submissions one at a time instead,
+        see bulk_create_with_pks.
+        """
+        if not validated_items:
+            return []
+        session = validated_items[0]['session']
+        with transaction.atomic():
+            submissions = bulk_create_with_pks(SurveySubmission, [
+                SurveySubmission(session=session) for _ in validated_items
+            ])
+            self.create_responses(session, [
+                (submission, data['responses'])
+                for submission, data in zip(submissions, validated_items)
+            ])
+        return submissions
+
+    @staticmethod
+    def create_responses(session, submission_responses):
+        """
+        Bulk create the validated responses of (submission, responses)
+        pairs and add them to the session's summary.
+        """
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(
+                submission=submission,
+                session=session,
+                question_id=response_data['question'].id,
+                choice_id=response_data['choice'].id
+                if 'choice' in response_data else None,
+                text=response_data.get('text'),
+                numeric_value=response_data.get('numeric_value')
+            )
+            for submission, responses in submission_responses
+            for response_data in responses
+        ])
+        update_session_summary(session, [
+            (
+                submission.id,
+                response_data['question'].id,
+                response_data['choice'].id
+                if 'choice' in response_data else None,
+                response_data.get('text'),
+                response_data.get('numeric_value')
+            )
+            for submission, responses in submission_responses
+            for response_data in responses
+        ])
+
     def update(self, instance, validated_data):
         """
         Updating a submission is not supported.
@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_session_code
+from .models import (SurveyQuestion, SurveyQuestionChoice, SurveySession,
+                     SurveySessionSummary, SurveySubmission)
+
+
+@receiver(post_save, sender=SurveySession)
+@receiver(post_delete, sender=SurveySession)
+def invalidate_session_code_cache(sender, instance, **kwargs):
+    """
+    Keeps cached code lookups up to date when sessions are created or
+    deleted, including sessions deleted along with their survey.
+    """
+    invalidate_session_code(instance.code)
+
+
+@receiver(post_delete, sender=SurveySubmission)
+def mark_session_summary_stale(sender, instance, **kwargs):
+    """
+    Marks the session's summary as stale when a submission is deleted,
+    whether through the API, the admin, a queryset or a cascade, so it's
+    rebuilt the next time it's read.
+
+    Responses aren't watched: a receiver would make Django load and signal
+    every response of a deleted submission instead of deleting them with
+    one query. Responses aren't added or changed on their own (neither the
+    API nor the admin can), and the admin marks the summary stale when it
+    deletes them. Otherwise they're only deleted along with their
+    submission, or with a question or choice, whose counts aren't reported
+    anymore.
+    """
+    SurveySessionSummary.objects\
+        .filter(session_id=instance.session_id)\
+        .filter(data__isnull=False)\
+        .update(data=None)
+
+
+@receiver(post_save, sender=SurveyQuestion)
+def touch_question_survey(sender, instance, raw=False, **kwargs):
+    """
+    Marks the survey as modified when one of its questions is saved,
+    through the API, the admin or the ORM, so its cached schema and
+    questions aren't used anymore.
+
+    Deletes aren't watched: a receiver would make Django load and signal
+    every question and choice of a deleted survey, and touch the survey
+    once for each of them. Views and the admin touch the survey after
+    deleting its questions or choices instead.
+    """
+    if not raw:
+        instance.survey.touch()
+
+
+@receiver(post_save, sender=SurveyQuestionChoice)
+def touch_choice_survey(sender, instance, raw=False, **kwargs):
+    """ Marks the survey as modified when a choice is saved. """
+    if not raw:
+        instance.question.survey.touch()
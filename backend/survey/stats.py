@@ -0,0 +1,195 @@
+from collections import Counter, defaultdict
+from fractions import Fraction
+from .models import SurveySessionSummary
+
+
+def summarize_histogram(histogram):
+    """
+    Returns min, max, mean and median of the values in a histogram
+    ({value: number of occurrences}). The results are identical to calling
+    the functions in `statistics` on the expanded list of values.
+    """
+    # JSON can't serialize NaNs, so we'll just use a None (null)
+    NaN = None
+
+    values = sorted(v for v, n in histogram.items() if n > 0)
+    total = sum(histogram[v] for v in values)
+    if total == 0:
+        return {'min': NaN, 'max': NaN, 'mean': NaN, 'median': NaN}
+
+    # statistics.mean sums the values exactly before dividing
+    exact_sum = sum(Fraction(v) * histogram[v] for v in values)
+
+    # find the value(s) in the middle of the sorted list
+    lower, upper = None, None
+    lower_index, upper_index = (total - 1) // 2, total // 2
+    seen = 0
+    for v in values:
+        seen += histogram[v]
+        if lower is None and seen > lower_index:
+            lower = v
+        if seen > upper_index:
+            upper = v
+            break
+
+    return {
+        'min': values[0],
+        'max': values[-1],
+        'mean': float(exact_sum / total),
+        'median': lower if total % 2 == 1 else (lower + upper) / 2
+    }
+
+
+class ResponseStats:
+    """
+    Statistics of the responses to one question, either for all submissions
+    or for the submissions of one group. Choices are counted and numeric
+    values are kept as histograms, so min/max/mean/median can be computed
+    without keeping the responses around. Counts can be merged, which is
+    what keeps SurveySessionSummary up to date.
+    """
+
+    def __init__(self):
+        # choice id (str) -> number of responses
+        self.choice_counts = Counter()
+        # choice id (str) or None -> {numeric value: number of responses}
+        self.value_counts = defaultdict(Counter)
+        self.answers = list()
+
+    def add(self, choice_id, text, numeric_value, count=1):
+        if choice_id is not None:
+            self.choice_counts[str(choice_id)] += count
+        if numeric_value is not None:
+            key = str(choice_id) if choice_id is not None else None
+            self.value_counts[key][numeric_value] += count
+        if text is not None:
+            self.answers.extend([text] * count)
+
+    def merge(self, other, sign=1):
+        """
+        Adds (sign=1) or subtracts (sign=-1) the counts of another
+        ResponseStats. Text answers are not merged.
+        """
+        for c_id, count in other.choice_counts.items():
+            self.choice_counts[c_id] += sign * count
+        for key, histogram in other.value_counts.items():
+            for value, count in histogram.items():
+                self.value_counts[key][value] += sign * count
+
+    def numeric_summary(self, choice_id=None):
+        return summarize_histogram(self.value_counts.get(choice_id, {}))
+
+    def to_json(self):
+        """
+        A JSON serializable copy of the counts. Text answers and
+        zero counts are left out.
+        """
+        return {
+            'choices': {
+                c_id: count
+                for c_id, count in self.choice_counts.items() if count
+            },
+            'values': {
+                # JSON keys must be strings
+                key if key is not None else '': [
+                    [value, count]
+                    for value, count in histogram.items() if count
+                ]
+                for key, histogram in self.value_counts.items()
+            }
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        stats.choice_counts.update(data['choices'])
+        for key, histogram in data['values'].items():
+            for value, count in histogram:
+                stats.value_counts[key or None][value] += count
+        return stats
+
+
+def collect_response_stats(responses, group_by_question_id=None):
+    """
+    Returns {question id: {group id: ResponseStats}} for an iterable of
+    (submission id, question id, choice id, text, numeric value) tuples.
+    The group id None holds the statistics for all submissions.
+    """
+    responses = list(responses)
+
+    # figure out which group each submission belongs to
+    submission_group = dict()
+    if group_by_question_id is not None:
+        for s_id, q_id, c_id, _, _ in responses:
+            if q_id == group_by_question_id and c_id is not None:
+                submission_group[s_id] = str(c_id)
+
+    stats = defaultdict(lambda: defaultdict(ResponseStats))
+    for s_id, q_id, c_id, text, numeric_value in responses:
+        question_stats = stats[q_id]
+        question_stats[None].add(c_id, text, numeric_value)
+        g_id = submission_group.get(s_id)
+        if g_id is not None:
+            question_stats[g_id].add(c_id, text, numeric_value)
+
+    return stats
+
+
+def stats_to_json(stats):
+    """ The inverse of stats_from_json. """
+    return {
+        str(q_id): {
+            'all': question_stats.get(None, ResponseStats()).to_json(),
+            'by_group': {
+                g_id: group_stats.to_json()
+                for g_id, group_stats in question_stats.items()
+                if g_id is not None
+            }
+        }
+        for q_id, question_stats in stats.items()
+    }
+
+
+def stats_from_json(data):
+    """
+    Turns SurveySessionSummary.data back into
+    {question id (str): {group id: ResponseStats}}.
+    """
+    stats = defaultdict(lambda: defaultdict(ResponseStats))
+    for q_id, question_data in data.items():
+        stats[q_id][None] = ResponseStats.from_json(question_data['all'])
+        for g_id, group_data in question_data['by_group'].items():
+            stats[q_id][g_id] = ResponseStats.from_json(group_data)
+    return stats
+
+
+def update_session_summary(session, responses):
+    """
+    Adds a submission's responses to the session's SurveySessionSummary.
+
+    Must be called in the same transaction that creates the responses,
+    after they have been written. If there's no up to date summary to
+    update, it's marked as stale and will be rebuilt the next time it's
+    read. Deleted submissions mark the summary as stale (see
+    survey.signals).
+    """
+    group_by_question_id = session.survey.group_by_question_id
+    summary, created = SurveySessionSummary.objects\
+        .select_for_update()\
+        .get_or_create(session=session)
+
+    if created or summary.data is None \
+            or summary.group_by_question_id != group_by_question_id:
+        if summary.data is not None:
+            summary.data = None
+            summary.save(update_fields=['data'])
+        return
+
+    stats = stats_from_json(summary.data)
+    delta = collect_response_stats(responses, group_by_question_id)
+    for q_id, question_delta in delta.items():
+        for g_id, group_delta in question_delta.items():
+            stats[str(q_id)][g_id].merge(group_delta)
+
+    summary.data = stats_to_json(stats)
+    summary.save(update_fields=['data'])
@@ -1,5 +1,39 @@
+from collections import Counter, defaultdict
+from django.db import connection, transaction
+from django.db.models import (Aggregate, Avg, Count, FloatField, Max, Min,
+                              OuterRef, Subquery)
+from .models import (SurveyQuestion, SurveyQuestionChoice, SurveyResponse,
+                     SurveySessionSummary)
 from .serializers import NestedSurveyQuestionSerializer, SurveySerializer
-from statistics import mean, median
+from .stats import (ResponseStats, collect_response_stats, stats_from_json,
+                    stats_to_json, summarize_histogram)
+
+
+class AggregatedResponseStats(ResponseStats):
+    """
+    Like ResponseStats, but numeric summaries are filled in from database
+    aggregates instead of being computed from the histograms.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # choice id (str) or None -> {'min': ..., 'max': ..., ...}
+        self.numeric = dict()
+
+    def numeric_summary(self, choice_id=None):
+        if choice_id not in self.numeric:
+            return summarize_histogram({})
+        return self.numeric[choice_id]
+
+
+class Median(Aggregate):
+    """
+    The median of a numeric column. Only supported by PostgreSQL.
+    """
+    function = 'PERCENTILE_CONT'
+    name = 'Median'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
 
 
 class SubmissionSummarizer:
@@ -15,39 +49,37 @@ class SubmissionSummarizer:
         # include a copy of the survey object
         summary['survey'] = SurveySerializer(survey).data
 
-        # process group question related stuff
-        group_by_question = survey.group_by_question
-        if group_by_question is not None:
-            responses = group_by_question.responses\
-                .filter(submission__session=session)\
-                .select_related('choice')
-            submissions_by_group = {
-                c.id: list()
-                for c in group_by_question.choices.all()
-            }
-            for response in responses:
-                submissions_by_group[response.choice.id]\
-                    .append(response.submission.id)
+        # all questions and choices are fetched up front
+        questions = list(
+            SurveyQuestion.objects
+            .filter(survey=survey)
+            .prefetch_related('choices')
+        )
 
+        group_by_question = next(
+            (q for q in questions if q.id == survey.group_by_question_id),
+            None
+        )
+        if group_by_question is not None:
             # include a copy of group by question in the result
             serializer = NestedSurveyQuestionSerializer(group_by_question)
             summary['group_by_question'] = serializer.data
+            group_ids = [str(c.id) for c in group_by_question.choices.all()]
         else:
             summary['group_by_question'] = None
+            group_ids = []
+
+        stats = self.collect_stats(session, questions, group_by_question)
 
         # per-question summary
         summary['question_summary'] = list()
 
-        for question in survey.questions.all().prefetch_related('choices'):
+        for question in questions:
 
             # no need to summarize group_by_question
             if question == group_by_question:
                 continue
 
-            responses = question.responses\
-                .filter(submission__session=session)\
-                .select_related('choice')
-
             try:
                 summarizer = getattr(self, f'summarize_{question.type}')
             except AttributeError:
@@ -55,6 +87,8 @@ class SubmissionSummarizer:
                     f"Can't summarize question type {question.type}"
                 )
 
+            question_stats = stats.get(question.id, {})
+
             question_summary = dict()
 
             # include a copy of the question
@@ -62,83 +96,322 @@ class SubmissionSummarizer:
             question_summary['question'] = question_serializer.data
 
             # summary for all responses
-            question_summary['all'] = summarizer(question, responses)
+            question_summary['all'] = summarizer(
+                question, question_stats.get(None, ResponseStats())
+            )
 
             # per-group summary
             if group_by_question is not None:
-                question_summary['by_group'] = dict()
-                for g_id, s_ids in submissions_by_group.items():
-                    group_responses = responses.filter(submission__in=s_ids)
-                    group_summary = summarizer(question, group_responses)
-                    question_summary['by_group'][str(g_id)] = group_summary
+                question_summary['by_group'] = {
+                    g_id: summarizer(
+                        question, question_stats.get(g_id, ResponseStats())
+                    )
+                    for g_id in group_ids
+                }
 
             summary['question_summary'].append(question_summary)
 
         self.data = summary
 
+    def collect_stats(self, session, questions, group_by_question):
+        """
+        Returns {question id: {group id: ResponseStats}}. The group id None
+        holds the statistics for all submissions.
+
+        All responses of the session are read in a single query.
+        """
+        responses = SurveyResponse.objects\
+            .filter(session=session)\
+            .order_by('id')\
+            .values_list(
+                'submission_id', 'question_id', 'choice_id',
+                'text', 'numeric_value'
+            )
+        group_by_question_id = group_by_question.id \
+            if group_by_question is not None else None
+        return collect_response_stats(responses, group_by_question_id)
+
     # Handlers for various questions types
 
-    def summarize_MC(self, question, responses):
-        summary = self._summarize_choices(question, responses)
-        values = self._choices_to_floats(question, responses)
+    def summarize_MC(self, question, stats):
+        summary = self._summarize_choices(question, stats)
+        values = self._choices_to_floats(question, stats)
         if values is not None:
-            summary = {**summary, **self._summarize_numeric_values(values)}
+            summary = {**summary, **summarize_histogram(values)}
         return summary
 
-    def summarize_CB(self, question, responses):
-        return self._summarize_choices(question, responses)
+    def summarize_CB(self, question, stats):
+        return self._summarize_choices(question, stats)
 
-    def summarize_DP(self, question, responses):
-        return self._summarize_choices(question, responses)
+    def summarize_DP(self, question, stats):
+        return self._summarize_choices(question, stats)
 
-    def summarize_SC(self, question, responses):
-        return self._summarize_numeric_values(
-            [r.numeric_value for r in responses]
-        )
+    def summarize_SC(self, question, stats):
+        return stats.numeric_summary()
 
-    def summarize_SA(self, question, responses):
-        return self._summarize_text(question, responses)
+    def summarize_SA(self, question, stats):
+        return self._summarize_text(question, stats)
 
-    def summarize_PA(self, question, responses):
-        return self._summarize_text(question, responses)
+    def summarize_PA(self, question, stats):
+        return self._summarize_text(question, stats)
 
-    def summarize_RK(self, question, responses):
+    def summarize_RK(self, question, stats):
         ranking = {
-            str(c.id): self._summarize_numeric_values([
-                r.numeric_value for r in responses if r.choice == c
-            ])
+            str(c.id): stats.numeric_summary(str(c.id))
             for c in question.choices.all()
         }
         return {'ranking': ranking}
 
     # Helpers
 
-    def _summarize_choices(self, question, responses):
-        count = {str(c.id): 0 for c in question.choices.all()}
-        for response in responses:
-            count[str(response.choice.id)] += 1
+    def _summarize_choices(self, question, stats):
+        count = {
+            str(c.id): stats.choice_counts[str(c.id)]
+            for c in question.choices.all()
+        }
         return {"count": count}
 
-    def _summarize_text(self, question, responses):
-        return {'answers': [r.text for r in responses]}
-
-    def _summarize_numeric_values(self, values):
-        # JSON can't serialize NaNs, so we'll just use a None (null)
-        NaN = None
-        return {
-            'min': min(values, default=NaN),
-            'max': max(values, default=NaN),
-            'mean': mean(values) if len(values) else NaN,
-            'median': median(values) if len(values) else NaN
-        }
+    def _summarize_text(self, question, stats):
+        return {'answers': list(stats.answers)}
 
-    def _choices_to_floats(self, question, responses):
+    def _choices_to_floats(self, question, stats):
         """
-        Returns a list of floats if all choices can be 
-        interpreted as floats. Returns None otherwise.
+        Returns a histogram of the chosen choices as floats if all choices
+        can be interpreted as floats. Returns None otherwise.
         """
         try:
-            map = {c.id: float(c.description) for c in question.choices.all()}
+            map = {str(c.id): float(c.description)
+                   for c in question.choices.all()}
         except ValueError:
             return None
-        return [map[r.choice.id] for r in responses]
+        histogram = Counter()
+        for c_id, value in map.items():
+            histogram[value] += stats.choice_counts[c_id]
+        return histogram
+
+
+class AggregateSubmissionSummarizer(SubmissionSummarizer):
+    """
+    A SubmissionSummarizer that lets the database do the counting.
+
+    Choice counts and min/max/mean are computed with GROUP BY queries over
+    (question, choice, group), so no response rows are loaded except for
+    text answers. Medians use PERCENTILE_CONT where the database supports
+    it, otherwise they are computed from per-value counts.
+    """
+
+    text_question_types = [
+        SurveyQuestion.QuestionType.SHORT_ANSWER,
+        SurveyQuestion.QuestionType.PARAGRAPH,
+    ]
+
+    def collect_stats(self, session, questions, group_by_question):
+        responses = self.get_responses(session, group_by_question)
+        counted_ids = self.get_counted_question_ids(questions, group_by_question)
+        use_percentile = connection.vendor == 'postgresql'
+
+        stats = defaultdict(lambda: defaultdict(AggregatedResponseStats))
+
+        for fields in self.get_groupings(group_by_question):
+            aggregates = {
+                'count': Count('id'),
+                'min': Min('numeric_value'),
+                'max': Max('numeric_value'),
+                'mean': Avg('numeric_value'),
+            }
+            if use_percentile:
+                aggregates['median'] = Median('numeric_value')
+
+            rows = responses\
+                .filter(question__in=counted_ids)\
+                .values(*fields)\
+                .annotate(**aggregates)\
+                .order_by()
+            for row in self._grouped(rows, stats):
+                group_stats, c_id = row['stats'], row['choice']
+                if c_id is not None:
+                    group_stats.choice_counts[str(c_id)] += row['count']
+                if row['min'] is not None:
+                    key = str(c_id) if c_id is not None else None
+                    group_stats.numeric[key] = {
+                        'min': row['min'],
+                        'max': row['max'],
+                        'mean': row['mean'],
+                        'median': row.get('median'),
+                    }
+
+            if not use_percentile:
+                # fall back to counting each distinct value
+                rows = responses\
+                    .filter(
+                        question__in=counted_ids,
+                        numeric_value__isnull=False
+                    )\
+                    .values(*fields, 'numeric_value')\
+                    .annotate(count=Count('id'))\
+                    .order_by()
+                for row in self._grouped(rows, stats):
+                    c_id = row['choice']
+                    key = str(c_id) if c_id is not None else None
+                    row['stats'].value_counts[key][row['numeric_value']] \
+                        += row['count']
+
+        if not use_percentile:
+            for question_stats in stats.values():
+                for group_stats in question_stats.values():
+                    for key, summary in group_stats.numeric.items():
+                        summary['median'] = summarize_histogram(
+                            group_stats.value_counts[key]
+                        )['median']
+
+        self.collect_answers(responses, questions, stats)
+
+        return stats
+
+    def get_responses(self, session, group_by_question):
+        """
+        Returns the session's responses. If there's a group_by_question,
+        each response is annotated with its submission's group as `group`.
+        """
+        responses = SurveyResponse.objects.filter(session=session)
+        if group_by_question is not None:
+            group_choice = SurveyResponse.objects\
+                .filter(
+                    submission=OuterRef('submission'),
+                    question=group_by_question.id
+                )\
+                .values('choice')[:1]
+            responses = responses.annotate(group=Subquery(
+                group_choice,
+                output_field=SurveyQuestionChoice._meta.pk
+            ))
+        return responses
+
+    def get_groupings(self, group_by_question):
+        """
+        Fields to group by: once for all submissions, and once more for
+        each group if there's a group_by_question.
+        """
+        groupings = [('question', 'choice')]
+        if group_by_question is not None:
+            groupings.append(('question', 'choice', 'group'))
+        return groupings
+
+    def get_counted_question_ids(self, questions, group_by_question):
+        """ Ids of the questions whose responses can be counted. """
+        return [
+            q.id for q in questions
+            if q.type not in self.text_question_types
+            and q != group_by_question
+        ]
+
+    def collect_answers(self, responses, questions, stats):
+        """
+        Adds text answers to stats. Text answers can't be aggregated, so
+        they are read (as plain values) in a single query.
+        """
+        text_ids = [
+            q.id for q in questions if q.type in self.text_question_types
+        ]
+        fields = ['question', 'text']
+        if 'group' in responses.query.annotations:
+            fields.append('group')
+
+        rows = responses\
+            .filter(question__in=text_ids, text__isnull=False)\
+            .order_by('id')\
+            .values(*fields)
+        for row in rows:
+            question_stats = stats[row['question']]
+            question_stats[None].answers.append(row['text'])
+            if row.get('group') is not None:
+                question_stats[str(row['group'])].answers.append(row['text'])
+
+    def _grouped(self, rows, stats):
+        """
+        Attaches the stats object a row belongs to as row['stats'].
+        Rows of submissions that don't belong to any group are skipped.
+        """
+        for row in rows:
+            if 'group' not in row:
+                g_id = None
+            elif row['group'] is not None:
+                g_id = str(row['group'])
+            else:
+                continue
+            row['stats'] = stats[row['question']][g_id]
+            yield row
+
+
+class MaterializedSubmissionSummarizer(AggregateSubmissionSummarizer):
+    """
+    A SubmissionSummarizer that reads counts from the session's
+    SurveySessionSummary instead of counting responses.
+
+    The SurveySessionSummary is built with GROUP BY queries the first time
+    it's needed (or when it's stale) and is kept up to date by
+    survey.stats.update_session_summary as submissions are made. Deleting
+    a submission marks it as stale (see survey.signals). Only text answers
+    are read from the responses.
+    """
+
+    def collect_stats(self, session, questions, group_by_question):
+        summary = self.get_session_summary(
+            session, questions, group_by_question
+        )
+        stats = stats_from_json(summary.data)
+        responses = self.get_responses(session, group_by_question)
+        self.collect_answers(responses, questions, stats)
+        return stats
+
+    def get_session_summary(self, session, questions, group_by_question):
+        """
+        Returns the session's SurveySessionSummary, (re)building it if
+        it's missing or stale.
+        """
+        group_by_question_id = group_by_question.id \
+            if group_by_question is not None else None
+
+        def is_stale(summary):
+            return summary is None or summary.data is None \
+                or summary.group_by_question_id != group_by_question_id
+
+        summary = SurveySessionSummary.objects\
+            .filter(session=session).first()
+        if not is_stale(summary):
+            return summary
+
+        with transaction.atomic():
+            # lock the summary so no submission is made while counting
+            summary, _ = SurveySessionSummary.objects\
+                .select_for_update()\
+                .get_or_create(session=session)
+            if is_stale(summary):
+                stats = self.count_responses(
+                    session, questions, group_by_question
+                )
+                summary.data = stats_to_json(stats)
+                summary.group_by_question_id = group_by_question_id
+                summary.save()
+        return summary
+
+    def count_responses(self, session, questions, group_by_question):
+        """
+        Counts the session's responses from scratch, for all submissions
+        and by group.
+        """
+        responses = self.get_responses(session, group_by_question)
+        counted_ids = self.get_counted_question_ids(questions, None)
+
+        stats = defaultdict(lambda: defaultdict(ResponseStats))
+        for fields in self.get_groupings(group_by_question):
+            rows = responses\
+                .filter(question__in=counted_ids)\
+                .values(*fields, 'numeric_value')\
+                .annotate(count=Count('id'))\
+                .order_by()
+            for row in self._grouped(rows, stats):
+                row['stats'].add(
+                    row['choice'], None, row['numeric_value'], row['count']
+                )
+        return stats
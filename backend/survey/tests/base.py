@@ -0,0 +1,39 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from ..cache import clear_session_code_cache
+from ..schema import clear_schema_cache
+
+
+def clear_caches():
+    """
+    Forgets everything cached in Django's cache and in this process.
+    Throttling counts requests in Django's cache too.
+    """
+    cache.clear()
+    clear_schema_cache()
+    clear_session_code_cache()
+
+
+def without_bulk_insert_returning():
+    """
+    Makes the database act like SQLite before 3.35, which doesn't return
+    primary keys from bulk inserts.
+    """
+    return mock.patch.object(
+        type(connection.features),
+        'can_return_rows_from_bulk_insert',
+        new_callable=mock.PropertyMock,
+        return_value=False
+    )
+
+
+class ClearCachesTestCase(TestCase):
+    """
+    Clears the caches after each test, so the requests made and the
+    objects cached by one test don't carry over to other tests.
+    """
+
+    def tearDown(self):
+        clear_caches()
@@ -0,0 +1,90 @@
+"""
+A test case for asserting that endpoints run a constant number of queries,
+no matter how many questions or submissions they serve.
+"""
+import difflib
+import re
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from .base import ClearCachesTestCase, clear_caches
+
+# literals, so the same query with other ids or values compares equal
+_string = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r'\b\d+(?:\.\d+)?\b')
+_savepoint = re.compile(r'"s\w+_x\d+"')
+# lists that get longer with the data but are still one query
+_in_list = re.compile(r'IN \(\?(?:, \?)*\)')
+_union_all = re.compile(r'(?: UNION ALL SELECT (?:\?|NULL)(?:, (?:\?|NULL))*)+')
+_case_when = re.compile(r'(?:WHEN \(.+?\) THEN (?:\?|NULL) )+')
+
+
+def normalize_sql(sql):
+    """ Replaces the literals of a query with placeholders. """
+    sql = _savepoint.sub('"savepoint"', sql)
+    sql = _string.sub('?', sql)
+    sql = _number.sub('?', sql)
+    sql = _in_list.sub('IN (...)', sql)
+    sql = _union_all.sub(' UNION ALL ...', sql)
+    return _case_when.sub('WHEN ... ', sql)
+
+
+class QueryBudgetTestCase(ClearCachesTestCase):
+    """
+    Runs requests against generated data of growing size and fails if the
+    number of queries grows with it, e.g. because of an N+1.
+
+    Caches are cleared before each request, so the queries of a cold
+    request are counted.
+    """
+
+    sizes = (1, 10, 100)
+
+    def capture_queries(self, request):
+        """ Returns the SQL of the queries run by request(). """
+        clear_caches()
+        with CaptureQueriesContext(connection) as context:
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(
+            response.status_code, 400, getattr(response, 'data', None)
+        )
+        return [query['sql'] for query in context.captured_queries]
+
+    def assertConstantQueries(self, setup, sizes=None, budget=None):
+        """
+        Calls setup(size) for each size, which creates data of that size and
+        returns a function making the request. Fails with a diff of the
+        captured SQL if a size runs more (or fewer) queries than the
+        first. If `budget` is given, the first size must run exactly that
+        many queries. The data of each size is rolled back.
+        """
+        baseline = None
+        for size in sizes or self.sizes:
+            with transaction.atomic():
+                queries = self.capture_queries(setup(size))
+                transaction.set_rollback(True)
+
+            if baseline is None:
+                baseline = size, queries
+                if budget is not None and len(queries) != budget:
+                    self.fail(
+                        f'{len(queries)} queries for size {size}, expected '
+                        f'{budget}:\n' + '\n'.join(queries)
+                    )
+                continue
+
+            base_size, base_queries = baseline
+            if len(queries) != len(base_queries):
+                diff = difflib.unified_diff(
+                    [normalize_sql(sql) for sql in base_queries],
+                    [normalize_sql(sql) for sql in queries],
+                    fromfile=f'size {base_size}',
+                    tofile=f'size {size}',
+                    lineterm=''
+                )
+                self.fail(
+                    f'{len(queries)} queries for size {size}, '
+                    f'{len(base_queries)} for size {base_size}:\n'
+                    + '\n'.join(diff)
+                )
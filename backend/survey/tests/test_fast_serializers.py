@@ -0,0 +1,113 @@
+from django.contrib.auth.models import User
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from ..fast_serializers import (serialize_questions, serialize_submissions,
+                                submission_values)
+from ..models import SurveyQuestion, SurveySubmission
+from ..serializers import (NestedSurveyQuestionSerializer,
+                           NestedSurveySubmissionSerializer)
+from .base import ClearCachesTestCase
+
+
+class FastSerializerTests(ClearCachesTestCase):
+    """ The fast serializers must render exactly like the DRF serializers. """
+
+    fixtures = ['test_submission_data.json']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.get(pk=1)
+        self.renderer = JSONRenderer()
+
+    def submit(self, responses):
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {'responses': responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def assertRendersEqual(self, data, expected):
+        self.assertEqual(
+            self.renderer.render(data),
+            self.renderer.render(expected)
+        )
+
+    def test_questions(self):
+        """ Questions of every type, with and without choices. """
+
+        questions = SurveyQuestion.objects.filter(survey='y09dl9W')
+        expected = NestedSurveyQuestionSerializer(
+            questions.prefetch_related('choices'), many=True
+        ).data
+        self.assertEqual(len(expected), 8)
+        self.assertRendersEqual(serialize_questions(questions), expected)
+
+    def test_no_questions(self):
+        questions = SurveyQuestion.objects.none()
+        self.assertRendersEqual(serialize_questions(questions), [])
+
+    def test_submissions(self):
+        """ Submissions with responses to every question type. """
+
+        self.submit([
+            {"question": "yO5lED9", "choice": "m2OkayZ"},
+            {"question": "R7jNpDG", "choice": "GDOaMOj"},
+            {"question": "R7jNpDG", "choice": "LjyRko9"},
+            {"question": "dBjywDL", "choice": "wKoPloR"},
+            {"question": "Lo5MY5R", "numeric_value": 8.0},
+            {"question": "GajwyDE", "text": "apple"},
+            {"question": "O2VeYVd", "text": "Describe the city you live in."},
+            {"question": "vQVx1jW", "choice": "eMNVmOD", "numeric_value": 1.0},
+            {"question": "vQVx1jW", "choice": "wGo71N5", "numeric_value": 2.0},
+            {"question": "vQVx1jW", "choice": "DMNxbo0", "numeric_value": 3.0},
+            {"question": "GrjLWV2", "text": "optional"},
+        ])
+        self.submit([
+            {"question": "yO5lED9", "choice": "WKo1dyZ"},
+            {"question": "R7jNpDG", "choice": "D9NXgO6"},
+            {"question": "dBjywDL", "choice": "M9O2bOA"},
+            {"question": "Lo5MY5R", "numeric_value": 3.0},
+            {"question": "GajwyDE", "text": "banana"},
+            {"question": "O2VeYVd", "text": ""},
+            {"question": "vQVx1jW", "choice": "DMNxbo0", "numeric_value": 1.0},
+            {"question": "vQVx1jW", "choice": "eMNVmOD", "numeric_value": 2.0},
+            {"question": "vQVx1jW", "choice": "wGo71N5", "numeric_value": 3.0},
+        ])
+        # a submission without responses
+        SurveySubmission.objects.create(session_id='Dy07DNq')
+
+        submissions = SurveySubmission.objects.filter(session='Dy07DNq')
+        expected = NestedSurveySubmissionSerializer(
+            submissions.prefetch_related('responses', 'responses__question'),
+            many=True
+        ).data
+        self.assertEqual(len(expected), 3)
+        self.assertRendersEqual(
+            serialize_submissions(submission_values(submissions)),
+            expected
+        )
+
+    def test_list_submissions(self):
+        """ The submissions list renders like the serializer. """
+
+        for _ in range(3):
+            self.submit([
+                {"question": "yO5lED9", "choice": "m2OkayZ"},
+                {"question": "R7jNpDG", "choice": "GDOaMOj"},
+                {"question": "dBjywDL", "choice": "wKoPloR"},
+                {"question": "Lo5MY5R", "numeric_value": 8.0},
+                {"question": "GajwyDE", "text": "apple"},
+                {"question": "O2VeYVd", "text": "text"},
+                {"question": "vQVx1jW", "choice": "eMNVmOD", "numeric_value": 1.0},
+                {"question": "vQVx1jW", "choice": "wGo71N5", "numeric_value": 2.0},
+                {"question": "vQVx1jW", "choice": "DMNxbo0", "numeric_value": 3.0},
+            ])
+
+        submissions = SurveySubmission.objects.filter(session='Dy07DNq')
+        expected = NestedSurveySubmissionSerializer(submissions, many=True).data
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/sessions/Dy07DNq/submissions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRendersEqual(response.data['results'], expected)
@@ -0,0 +1,78 @@
+from django.test import TestCase
+from hashids import Hashids
+from ..hashid_cache import (MemoizedHashids, clear_hashid_cache,
+                            encode_hashids, hashid_cache_stats)
+from ..models import Survey, SurveyQuestion
+
+
+class MemoizedHashidsTests(TestCase):
+
+    def setUp(self):
+        clear_hashid_cache()
+        self.hashids = MemoizedHashids(salt='salt', min_length=7)
+        self.plain = Hashids(salt='salt', min_length=7)
+
+    def test_encode(self):
+        """ Encoded ids are the same as Hashids' and are memoized. """
+
+        for id in [1, 2, 1, 1000, 2]:
+            self.assertEqual(self.hashids.encode(id), self.plain.encode(id))
+        stats = self.hashids.stats()['encode']
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['hit_rate'], 0.4)
+
+    def test_decode(self):
+        """ Decoded ids are the same as Hashids', even for invalid ones. """
+
+        hashid = self.plain.encode(42)
+        for value in [hashid, hashid, 'invalid']:
+            self.assertEqual(
+                self.hashids.decode(value), self.plain.decode(value)
+            )
+        self.assertEqual(self.hashids.stats()['decode']['hits'], 1)
+
+    def test_encode_many(self):
+        encoded = self.hashids.encode_many([3, 1, 3])
+        self.assertDictEqual(
+            encoded, {1: self.plain.encode(1), 3: self.plain.encode(3)}
+        )
+
+    def test_bounded(self):
+        hashids = MemoizedHashids(salt='salt', maxsize=2)
+        for id in range(10):
+            hashids.encode(id)
+        self.assertEqual(hashids.stats()['encode']['size'], 2)
+
+
+class HashidFieldCacheTests(TestCase):
+
+    def setUp(self):
+        clear_hashid_cache()
+
+    def test_models_share_memoized_hashids(self):
+        """ Ids of all models go through the cache of their salt. """
+
+        survey = Survey.objects.create(title='survey')
+        # a fresh instance is decoded from the database again
+        self.assertEqual(Survey.objects.get(pk=str(survey.id)), survey)
+
+        stats = hashid_cache_stats()
+        self.assertIn('survey.Survey', stats)
+        self.assertIn('survey.SurveySubmission', stats)
+        self.assertGreater(stats['survey.Survey']['encode']['hits'], 0)
+
+    def test_encode_hashids(self):
+        """ Batch encoding matches the ids the field builds. """
+
+        survey = Survey.objects.create(title='survey')
+        questions = SurveyQuestion.objects.bulk_create([
+            SurveyQuestion(survey=survey, number=i, title=str(i),
+                           required=False, type='SA')
+            for i in range(3)
+        ])
+        field = SurveyQuestion._meta.pk
+        encoded = encode_hashids(field, [q.id.id for q in questions])
+        self.assertDictEqual(
+            encoded, {q.id.id: str(q.id) for q in questions}
+        )
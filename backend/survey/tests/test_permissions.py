@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from ..models import SurveySession, SurveySubmission
+from .base import ClearCachesTestCase
+
+
+class ParentOwnershipTests(ClearCachesTestCase):
+    """
+    Only the owner of a session can see or change its submissions. The
+    owner is checked on the session loaded for the request, without
+    another query.
+    """
+
+    fixtures = ['test_submission_data.json']
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.get(pk=1)
+        self.other_user = User.objects.create_user('other user')
+        self.submission = {
+            "responses": [
+                {"question": "yO5lED9", "choice": "m2OkayZ"},
+                {"question": "R7jNpDG", "choice": "GDOaMOj"},
+                {"question": "dBjywDL", "choice": "wKoPloR"},
+                {"question": "Lo5MY5R", "numeric_value": 8.0},
+                {"question": "GajwyDE", "text": "apple"},
+                {"question": "O2VeYVd", "text": "a city"},
+                {"question": "vQVx1jW", "choice": "eMNVmOD",
+                 "numeric_value": 1.0},
+                {"question": "vQVx1jW", "choice": "wGo71N5",
+                 "numeric_value": 2.0},
+                {"question": "vQVx1jW", "choice": "DMNxbo0",
+                 "numeric_value": 3.0},
+            ]
+        }
+        # anyone can submit, this also loads the survey's schema
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            self.submission,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.submission_id = response.data['id']
+
+    def assertForbidden(self, method, url, data=None):
+        self.client.force_authenticate(self.other_user)
+        # the session only
+        with self.assertNumQueries(1):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_other_users_submissions(self):
+        submission_url = \
+            f'/api/sessions/Dy07DNq/submissions/{self.submission_id}/'
+        self.assertForbidden('get', '/api/sessions/Dy07DNq/submissions/')
+        self.assertForbidden('get', submission_url)
+        self.assertForbidden('delete', submission_url)
+        self.assertForbidden(
+            'get', '/api/sessions/Dy07DNq/submissions/summarize/'
+        )
+        self.assertForbidden(
+            'get', '/api/sessions/Dy07DNq/submissions/export.csv/'
+        )
+        self.assertForbidden(
+            'post', '/api/sessions/Dy07DNq/submissions/bulk/',
+            [self.submission]
+        )
+        self.assertTrue(
+            SurveySubmission.objects.filter(pk=self.submission_id).exists()
+        )
+
+    def test_other_users_can_submit(self):
+        self.client.force_authenticate(self.other_user)
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            self.submission,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_owners_submissions(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.get('/api/sessions/Dy07DNq/submissions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_other_users_session(self):
+        self.client.force_authenticate(self.other_user)
+
+        response = self.client.get('/api/sessions/Dy07DNq/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(1):
+            response = self.client.delete('/api/sessions/Dy07DNq/')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(SurveySession.objects.filter(pk='Dy07DNq').exists())
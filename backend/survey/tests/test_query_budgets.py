@@ -0,0 +1,304 @@
+import math
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from rest_framework.test import APIClient
+from ..models import (Survey, SurveyQuestion, SurveyResponse, SurveySession,
+                      SurveySubmission)
+from ..serializers import NestedSurveySubmissionSerializer
+from ..generate import generate_survey
+from .query_budget import QueryBudgetTestCase, normalize_sql
+
+
+class QueryBudgetHarnessTests(QueryBudgetTestCase):
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql(
+                'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (1, 2, 3) '
+                'AND "a"."text" = \'it\'\'s\''
+            ),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) '
+            'AND "a"."text" = ?'
+        )
+
+    def test_growing_queries(self):
+        """ An N+1 fails with the extra queries in the diff. """
+
+        owner = User.objects.create_user('owner')
+
+        def setup(size):
+            survey, _ = generate_survey(size, 0, owner)
+
+            def request():
+                for question in SurveyQuestion.objects.filter(survey=survey):
+                    list(question.choices.all())
+                return HttpResponse()
+            return request
+
+        with self.assertRaises(AssertionError) as context:
+            self.assertConstantQueries(setup, sizes=(1, 2))
+        message = str(context.exception)
+        self.assertIn('3 queries for size 2, 2 for size 1', message)
+        self.assertIn('+SELECT "survey_surveyquestionchoice"', message)
+
+
+class EndpointQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Every endpoint runs the same queries for 1, 10 or 100 questions or
+    submissions.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user('owner')
+        self.client.force_authenticate(self.owner)
+
+    def generate(self, questions, submissions):
+        return generate_survey(questions, submissions, self.owner)
+
+    def get(self, url):
+        return lambda: self.client.get(url)
+
+    def test_list_surveys(self):
+        def setup(size):
+            Survey.objects.bulk_create([
+                Survey(title=f'survey {i}') for i in range(size)
+            ])
+            return self.get('/api/surveys/')
+        # count, page
+        self.assertConstantQueries(setup, budget=2)
+
+    def test_list_sessions(self):
+        def setup(size):
+            surveys = Survey.objects.bulk_create([
+                Survey(title=f'survey {i}') for i in range(size)
+            ])
+            SurveySession.objects.bulk_create([
+                SurveySession(survey=survey, owner=self.owner, code=1000 + i)
+                for i, survey in enumerate(surveys)
+            ])
+            return self.get('/api/sessions/')
+        # count, page
+        self.assertConstantQueries(setup, budget=2)
+
+    def test_list_questions(self):
+        def setup(size):
+            survey, _ = self.generate(size, 0)
+            return self.get(f'/api/surveys/{survey.id}/questions/')
+        # survey, questions, choices
+        self.assertConstantQueries(setup, budget=3)
+
+    def test_create_question(self):
+        def setup(size):
+            survey, _ = self.generate(0, 0)
+            return lambda: self.client.post(
+                f'/api/surveys/{survey.id}/questions/',
+                {
+                    "number": 1,
+                    "title": "Which is better?",
+                    "required": True,
+                    "type": "MC",
+                    "choices": [
+                        {"value": str(i), "description": f'choice {i}'}
+                        for i in range(size)
+                    ]
+                },
+                format='json'
+            )
+        # survey, question and choice inserts, a savepoint around them
+        # (opened and released), touch the survey, choices for the
+        # response body
+        self.assertConstantQueries(setup, budget=7)
+
+    def test_update_question(self):
+        def setup(size):
+            survey, _ = self.generate(0, 0)
+            question = self.client.post(
+                f'/api/surveys/{survey.id}/questions/',
+                {
+                    "number": 1,
+                    "title": "Which is better?",
+                    "required": True,
+                    "type": "DP",
+                    "choices": [
+                        {"value": str(i), "description": f'choice {i}'}
+                        for i in range(size * 2)
+                    ]
+                },
+                format='json'
+            ).data
+            # change half of the choices, remove the rest and add new ones
+            choices = question['choices'][:size]
+            for choice in choices:
+                choice['description'] += ' (changed)'
+            question['choices'] = choices + [
+                {"value": f'new {i}', "description": f'new {i}'}
+                for i in range(size)
+            ]
+            return lambda: self.client.put(
+                f'/api/surveys/{survey.id}/questions/{question["id"]}/',
+                question,
+                format='json'
+            )
+        self.assertConstantQueries(setup)
+
+    def test_replace_questions(self):
+        def setup(size):
+            survey, _ = self.generate(size, 0)
+            questions = self.client.get(
+                f'/api/surveys/{survey.id}/questions/'
+            ).data
+            # remove the first question and the first choice of the others,
+            # change the rest and add a new question and choices
+            questions = questions[1:]
+            for question in questions:
+                question['title'] += ' (changed)'
+                if question.get('choices'):
+                    choices = question['choices'][1:]
+                    for choice in choices:
+                        choice['description'] += ' (changed)'
+                    question['choices'] = choices + [
+                        {"value": "new", "description": "new"}
+                    ]
+            questions.append({
+                "number": size + 1,
+                "title": "new",
+                "required": True,
+                "type": "MC",
+                "choices": [{"value": "new", "description": "new"}]
+            })
+            return lambda: self.client.put(
+                f'/api/surveys/{survey.id}/questions/',
+                questions,
+                format='json'
+            )
+        # one question would leave no question or choice to change
+        self.assertConstantQueries(setup, sizes=(10, 100))
+
+    def test_duplicate_survey(self):
+        def setup(size):
+            survey, _ = self.generate(size, 0)
+            # the copy's group_by_question is set with one more query
+            survey.group_by_question = survey.questions.get(number=1)
+            survey.save()
+            return lambda: self.client.post(
+                f'/api/surveys/{survey.id}/duplicate/'
+            )
+        self.assertConstantQueries(setup)
+
+    def test_join(self):
+        def setup(size):
+            _, session = self.generate(size, 0)
+            return self.get(f'/api/codes/{session.code}/join/')
+        # session, questions, choices
+        self.assertConstantQueries(setup, budget=3)
+
+    def test_submit(self):
+        def setup(size):
+            _, session = self.generate(size, 1)
+            submission = SurveySubmission.objects.get(session=session)
+            responses = NestedSurveySubmissionSerializer(
+                submission
+            ).data['responses']
+            return lambda: self.client.post(
+                f'/api/sessions/{session.id}/submissions/',
+                {"responses": responses},
+                format='json'
+            )
+        # session, questions and choices of the schema, submission and
+        # response inserts, summary lookup and creation, 2 nested
+        # savepoints (each opened and released), the new responses and
+        # their questions for the response body
+        self.assertConstantQueries(setup, budget=13)
+
+    def test_bulk(self):
+        def setup(size):
+            _, session = self.generate(10, 1)
+            submission = SurveySubmission.objects.get(session=session)
+            self.responses = \
+                NestedSurveySubmissionSerializer(submission).data['responses']
+            return lambda: self.client.post(
+                f'/api/sessions/{session.id}/submissions/bulk/',
+                [{"responses": self.responses}] * size,
+                format='json'
+            )
+        # session, submission and response inserts, summary lookup and
+        # creation, 2 nested savepoints (each opened and released)
+        self.assertConstantQueries(setup, sizes=(1, 10), budget=11)
+
+        # SQLite limits the number of variables of a query, so with 100
+        # submissions the responses take one INSERT per batch
+        queries = self.capture_queries(setup(100))
+        response_count = 100 * len(self.responses)
+        fields = [
+            field for field in SurveyResponse._meta.concrete_fields
+            if not field.primary_key
+        ]
+        batch_size = connection.ops.bulk_batch_size(
+            fields, [None] * response_count
+        )
+        inserts = [
+            sql for sql in queries
+            if sql.startswith('INSERT INTO "survey_surveyresponse"')
+        ]
+        self.assertEqual(len(inserts), math.ceil(response_count / batch_size))
+        self.assertEqual(len(queries) - len(inserts), 10)
+
+    def test_list_submissions(self):
+        def setup(size):
+            _, session = self.generate(10, size)
+            return self.get(f'/api/sessions/{session.id}/submissions/')
+        # session, count, page, responses of the page
+        self.assertConstantQueries(setup, budget=4)
+
+    def test_fetch_submission(self):
+        def setup(size):
+            _, session = self.generate(size, 1)
+            submission = SurveySubmission.objects.get(session=session)
+            return self.get(
+                f'/api/sessions/{session.id}/submissions/{submission.id}/'
+            )
+        # session, submission, responses, questions
+        self.assertConstantQueries(setup, budget=4)
+
+    def test_delete_submission(self):
+        def setup(size):
+            _, session = self.generate(size, 1)
+            submission = SurveySubmission.objects.get(session=session)
+            return lambda: self.client.delete(
+                f'/api/sessions/{session.id}/submissions/{submission.id}/'
+            )
+        # session, submission, response and submission deletes, stale
+        # summary
+        self.assertConstantQueries(setup, budget=5)
+
+    def test_summarize_submissions(self):
+        def setup(size):
+            _, session = self.generate(10, size)
+            return self.get(
+                f'/api/sessions/{session.id}/submissions/summarize/'
+            )
+        self.assertConstantQueries(setup)
+
+    def test_summarize_questions(self):
+        def setup(size):
+            _, session = self.generate(size, 2)
+            return self.get(
+                f'/api/sessions/{session.id}/submissions/summarize/'
+            )
+        # text answers are read with a query of their own, so start with
+        # a question of every type
+        types = len(SurveyQuestion.QuestionType)
+        self.assertConstantQueries(setup, sizes=(types, 10, 100))
+
+    def test_export(self):
+        for export_format in ('csv', 'ndjson'):
+            def setup(size):
+                _, session = self.generate(10, size)
+                return self.get(
+                    f'/api/sessions/{session.id}/submissions/'
+                    f'export.{export_format}/'
+                )
+            # session, questions, choices, submissions with responses
+            self.assertConstantQueries(setup, budget=4)
@@ -0,0 +1,91 @@
+import re
+from unittest import skipUnless
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from .base import ClearCachesTestCase
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class QueryPlanTests(ClearCachesTestCase):
+    """
+    The queries of hot endpoints must find their rows through indexes
+    instead of scanning whole tables, so they don't slow down as surveys,
+    sessions and submissions pile up.
+    """
+
+    fixtures = ['test_submission_data.json']
+
+    # e.g. "SCAN survey_surveyresponse" ("SCAN TABLE survey_surveyresponse"
+    # before SQLite 3.36), but not
+    # "SCAN survey_survey USING INDEX survey_created_at_idx"
+    full_scan = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=1))
+
+    def get_query_plans(self, url):
+        """ Returns [(sql, [plan lines])] of the SELECTs run by a GET. """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(
+                    (query['sql'], [row[-1] for row in cursor.fetchall()])
+                )
+        return plans
+
+    def assertNoFullScans(self, url):
+        for sql, plan in self.get_query_plans(url):
+            for line in plan:
+                self.assertIsNone(
+                    self.full_scan.match(line),
+                    f'full table scan in\n{sql}\n' + '\n'.join(plan)
+                )
+
+    def assertNoSorting(self, url, table):
+        """ Rows of `table` are read in the order of an index. """
+        for sql, plan in self.get_query_plans(url):
+            if f'FROM "{table}"' not in sql:
+                continue
+            self.assertNotIn(
+                'USE TEMP B-TREE FOR ORDER BY', plan,
+                f'rows are sorted in\n{sql}\n' + '\n'.join(plan)
+            )
+
+    def test_submissions(self):
+        self.assertNoFullScans('/api/sessions/Dy07DNq/submissions/')
+        self.assertNoFullScans(
+            '/api/sessions/Dy07DNq/submissions/?pagination=cursor'
+        )
+        self.assertNoSorting(
+            '/api/sessions/Dy07DNq/submissions/?pagination=cursor',
+            'survey_surveysubmission'
+        )
+
+    def test_summary(self):
+        self.assertNoFullScans('/api/sessions/Dy07DNq/submissions/summarize/')
+
+    def test_export(self):
+        self.assertNoFullScans('/api/sessions/Dy07DNq/submissions/export.csv/')
+
+    def test_questions(self):
+        self.assertNoFullScans('/api/surveys/y09dl9W/questions/')
+
+    def test_join(self):
+        self.assertNoFullScans('/api/codes/1677/join/')
+
+    def test_surveys(self):
+        # searching by keyword (title__icontains) can't use an index
+        self.assertNoFullScans('/api/surveys/?pagination=cursor')
+        self.assertNoSorting('/api/surveys/?pagination=cursor', 'survey_survey')
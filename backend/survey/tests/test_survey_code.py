@@ -1,7 +1,11 @@
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
-from survey.models import SurveySession, Survey
+from survey.cache import SESSION_CODE_TIMEOUT, clear_session_code_cache
+from survey.models import (Survey, SurveyQuestion, SurveyQuestionChoice,
+                           SurveySession)
 
 class CodeToSessionSetTests(TestCase):
     def setUp(self):
@@ -48,3 +52,128 @@ class CodeToSessionSetTests(TestCase):
         detail = response.data.pop('detail')
         self.assertEqual(detail, "Not found.")
 
+    def test_lookup_code_cached(self):
+        """lookups are cached until the session is deleted"""
+        response = self.client.get(f'/api/codes/{self.session.code}/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/codes/{self.session.code}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.session.id)
+
+        # Django's cache is used when this process' cache is empty
+        clear_session_code_cache()
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/codes/{self.session.code}/')
+        self.assertEqual(response.data['id'], self.session.id)
+
+        self.session.delete()
+        response = self.client.get('/api/codes/1234/')
+        self.assertEqual(response.status_code, 404)
+
+        # a new session with the same code is found
+        session = SurveySession.objects.create(
+            survey=self.survey, code=1234, owner=self.user
+        )
+        response = self.client.get('/api/codes/1234/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], session.id)
+
+    def test_lookup_code_expires(self):
+        """lookups also expire from Django's cache, which may not be shared"""
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            response = self.client.get(f'/api/codes/{self.session.code}/')
+        self.assertEqual(response.status_code, 200)
+        cache_set.assert_any_call(
+            'survey:code:1234', mock.ANY, timeout=SESSION_CODE_TIMEOUT
+        )
+
+    def test_lookup_code_padded(self):
+        """codes written with leading zeros share the cached lookup"""
+        response = self.client.get('/api/codes/01234/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.session.id)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/codes/1234/')
+        self.assertEqual(response.status_code, 200)
+
+        self.session.delete()
+        response = self.client.get('/api/codes/01234/')
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get('/api/codes/abc/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_lookup_code_survey_deleted(self):
+        """sessions deleted along with their survey aren't found"""
+        response = self.client.get(f'/api/codes/{self.session.code}/')
+        self.assertEqual(response.status_code, 200)
+
+        self.survey.delete()
+        response = self.client.get(f'/api/codes/{self.session.code}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_join(self):
+        """the session, survey and questions are fetched together"""
+        question = SurveyQuestion.objects.create(
+            survey=self.survey, number=1, title='Which is better?',
+            type='MC', required=True
+        )
+        SurveyQuestionChoice.objects.create(
+            question=question, value='A', description='Star Trek'
+        )
+        SurveyQuestion.objects.create(
+            survey=self.survey, number=2, title='Why?',
+            type='SA', required=False
+        )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/codes/{self.session.code}/join/')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data['session']['id'], self.session.id)
+        self.assertEqual(response.data['survey']['id'], self.survey.id)
+        self.assertEqual(
+            [q['title'] for q in response.data['questions']],
+            ['Which is better?', 'Why?']
+        )
+        self.assertEqual(
+            response.data['questions'][0]['choices'][0]['description'],
+            'Star Trek'
+        )
+        # same as the questions endpoint
+        questions = self.client.get(f'/api/surveys/{self.survey.id}/questions/')
+        self.assertEqual(
+            sorted(response.data['questions'], key=lambda q: q['id']),
+            sorted(questions.data, key=lambda q: q['id'])
+        )
+
+    def test_join_published_cached(self):
+        """payloads of published surveys are cached until they're edited"""
+        self.survey.draft = False
+        self.survey.save()
+
+        response = self.client.get(f'/api/codes/{self.session.code}/join/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['questions'], [])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/codes/{self.session.code}/join/')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            f'/api/surveys/{self.survey.id}/questions/',
+            {'number': 1, 'title': 'Why?', 'type': 'SA', 'required': False},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(f'/api/codes/{self.session.code}/join/')
+        self.assertEqual(len(response.data['questions']), 1)
+
+    def test_join_invalid_code(self):
+        response = self.client.get(f'/api/codes/{1789}/join/')
+        self.assertEqual(response.status_code, 404)
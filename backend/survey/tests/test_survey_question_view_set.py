@@ -1,7 +1,10 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from survey.models import Survey, SurveyQuestion, SurveyQuestionChoice
+from .base import without_bulk_insert_returning
 
 
 class SurveyQuestionViewSetTests(TestCase):
@@ -857,6 +860,80 @@ class SurveyQuestionViewSetTests(TestCase):
             ]
         )
 
+    def update_dropdown_choices(self, choice_count):
+        """
+        Creates a dropdown question with `choice_count` choices, then edits
+        two of them, removes two and adds two. Returns the captured queries.
+        """
+        question = SurveyQuestion.objects.create(
+            survey=self.survey,
+            number=1,
+            title='Where are you from?',
+            type='DP',
+            required=True
+        )
+        choices = SurveyQuestionChoice.objects.bulk_create([
+            SurveyQuestionChoice(
+                question=question, value=str(i), description=f'country {i}'
+            )
+            for i in range(choice_count)
+        ])
+        data = [
+            {'id': str(c.id), 'value': c.value, 'description': c.description}
+            for c in choices
+        ]
+        data[0]['description'] = 'changed'
+        data[1]['value'] = 'changed'
+        del data[2:4]
+        data += [
+            {'value': 'new 1', 'description': 'new country 1'},
+            {'value': 'new 2', 'description': 'new country 2'},
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                f'/api/surveys/{self.survey.id}/questions/{question.id}/',
+                {
+                    'number': 1,
+                    'title': 'Where are you from?',
+                    'type': 'DP',
+                    'required': True,
+                    'choices': data
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertListEqual(
+            [c.pop('id') for c in response.data['choices'][:2]],
+            [str(choices[0].id), str(choices[1].id)]
+        )
+        self.assertListEqual(
+            list(question.choices.order_by('id').values_list(
+                'value', 'description'
+            )),
+            [(c['value'], c['description']) for c in data]
+        )
+        return queries.captured_queries
+
+    def test_update_question_choices_query_count(self):
+        """ Editing choices takes the same queries for any number of them """
+
+        self.client.force_authenticate(self.user)
+
+        few = self.update_dropdown_choices(10)
+        SurveyQuestion.objects.all().delete()
+        many = self.update_dropdown_choices(200)
+        self.assertEqual(len(few), len(many))
+
+        # only the changed choices are updated, in one statement
+        updates = [
+            q['sql'] for q in many
+            if q['sql'].startswith('UPDATE "survey_surveyquestionchoice"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0].count(' WHEN '), 2 * 2)
+
     def test_update_question_permissions(self):
         """
         only authenticated users can update questions
@@ -964,3 +1041,221 @@ class SurveyQuestionViewSetTests(TestCase):
             f'/api/surveys/{self.survey.id}/questions/{question.id}/'
         )
         self.assertEqual(response.status_code, 204)
+
+    def test_list_published_questions_cached(self):
+        """ questions of published surveys are cached until edited """
+
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            f'/api/surveys/{self.survey.id}/questions/',
+            {
+                "number": 1,
+                "title": "Which is better?",
+                "required": True,
+                "type": "SA"
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        question_id = response.data['id']
+
+        response = self.client.patch(
+            f'/api/surveys/{self.survey.id}/questions/{question_id}/',
+            {'title': 'Which is best?'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # drafts aren't cached
+        response = self.client.get(f'/api/surveys/{self.survey.id}/questions/')
+        self.assertEqual(response.data[0]['title'], 'Which is best?')
+
+        response = self.client.patch(
+            f'/api/surveys/{self.survey.id}/', {'draft': False}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(f'/api/surveys/{self.survey.id}/questions/')
+        expected = response.data
+
+        # only the survey is read
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/api/surveys/{self.survey.id}/questions/'
+            )
+        self.assertEqual(response.data, expected)
+
+        # editing a question invalidates the cache
+        response = self.client.patch(
+            f'/api/surveys/{self.survey.id}/questions/{question_id}/',
+            {'title': 'Which is better?'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/surveys/{self.survey.id}/questions/')
+        self.assertEqual(response.data[0]['title'], 'Which is better?')
+
+        # so does making the survey a draft again
+        SurveyQuestion.objects.filter(pk=question_id).update(title='changed')
+        response = self.client.patch(
+            f'/api/surveys/{self.survey.id}/', {'draft': True}, format='json'
+        )
+        response = self.client.get(f'/api/surveys/{self.survey.id}/questions/')
+        self.assertEqual(response.data[0]['title'], 'changed')
+
+    def test_replace_questions(self):
+        """ PUT /surveys/<survey_id>/questions/ saves all questions at once """
+
+        self.client.force_authenticate(self.user)
+
+        kept = SurveyQuestion.objects.create(
+            survey=self.survey, number=1, title='Which is better?',
+            type='MC', required=True
+        )
+        kept_choice, removed_choice = SurveyQuestionChoice.objects.bulk_create([
+            SurveyQuestionChoice(question=kept, value='A', description='Star Trek'),
+            SurveyQuestionChoice(question=kept, value='B', description='Star Wars'),
+        ])
+        removed = SurveyQuestion.objects.create(
+            survey=self.survey, number=2, title='Why?',
+            type='PA', required=False
+        )
+
+        response = self.client.put(
+            f'/api/surveys/{self.survey.id}/questions/',
+            [
+                {
+                    'number': 1,
+                    'title': 'How much?',
+                    'required': True,
+                    'type': 'SC',
+                    'range_min': 1.0,
+                    'range_max': 5.0,
+                    'range_default': 3.0,
+                    'range_step': 1.0
+                },
+                {
+                    'id': str(kept.id),
+                    'number': 2,
+                    'title': 'Which is best?',
+                    'required': True,
+                    'type': 'MC',
+                    'choices': [
+                        {
+                            'id': str(kept_choice.id),
+                            'value': 'A',
+                            'description': 'Star Trek'
+                        },
+                        {'value': 'C', 'description': 'Stargate'}
+                    ]
+                },
+            ],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # the survey's questions, ordered by number
+        questions = response.data
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(questions[0]['title'], 'How much?')
+        self.assertEqual(questions[1]['id'], str(kept.id))
+        self.assertEqual(questions[1]['title'], 'Which is best?')
+        self.assertEqual(questions[1]['choices'][0]['id'], str(kept_choice.id))
+        self.assertListEqual(
+            [c['value'] for c in questions[1]['choices']], ['A', 'C']
+        )
+
+        self.assertFalse(SurveyQuestion.objects.filter(pk=removed.id).exists())
+        self.assertFalse(
+            SurveyQuestionChoice.objects.filter(pk=removed_choice.id).exists()
+        )
+        response = self.client.get(f'/api/surveys/{self.survey.id}/questions/')
+        self.assertEqual(len(response.data), 2)
+
+    def test_replace_questions_without_bulk_insert_returning(self):
+        """ New questions and their choices are saved on SQLite before 3.35 """
+
+        self.client.force_authenticate(self.user)
+
+        with without_bulk_insert_returning():
+            response = self.client.put(
+                f'/api/surveys/{self.survey.id}/questions/',
+                [
+                    {
+                        'number': number,
+                        'title': f'Question {number}',
+                        'required': True,
+                        'type': 'MC',
+                        'choices': [
+                            {'value': 'A', 'description': 'Star Trek'},
+                            {'value': 'B', 'description': 'Star Wars'}
+                        ]
+                    }
+                    for number in (1, 2)
+                ],
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        questions = SurveyQuestion.objects\
+            .filter(survey=self.survey)\
+            .order_by('number')
+        self.assertEqual(
+            [question.choices.count() for question in questions], [2, 2]
+        )
+
+    def test_replace_questions_invalid(self):
+        """ nothing is saved if any question is invalid """
+
+        self.client.force_authenticate(self.user)
+
+        question = SurveyQuestion.objects.create(
+            survey=self.survey, number=1, title='Why?',
+            type='PA', required=False
+        )
+        other_survey = Survey.objects.create(title='other survey')
+        other_question = SurveyQuestion.objects.create(
+            survey=other_survey, number=1, title='Why not?',
+            type='PA', required=False
+        )
+
+        new_question = {
+            'number': 2, 'title': 'New', 'type': 'SA', 'required': False
+        }
+        for questions in [
+            # a multiple choice question without choices
+            [new_question, {
+                'number': 3, 'title': 'Which?', 'type': 'MC', 'required': True
+            }],
+            # a question of another survey
+            [new_question, {
+                'id': str(other_question.id),
+                'number': 1, 'title': 'Mine', 'type': 'PA', 'required': False
+            }],
+            # the same question twice
+            [new_question] + [{
+                'id': str(question.id),
+                'number': 1, 'title': 'Twice', 'type': 'PA', 'required': False
+            }] * 2,
+        ]:
+            response = self.client.put(
+                f'/api/surveys/{self.survey.id}/questions/',
+                questions,
+                format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+
+        self.assertListEqual(
+            list(self.survey.questions.values_list('title', flat=True)),
+            ['Why?']
+        )
+        self.assertEqual(other_question.survey_id, other_survey.id)
+
+    def test_replace_questions_permissions(self):
+        """ only authenticated users can replace questions """
+
+        response = self.client.put(
+            f'/api/surveys/{self.survey.id}/questions/', [], format='json'
+        )
+        self.assertEqual(response.status_code, 401)
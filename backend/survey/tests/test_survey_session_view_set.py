@@ -1,3 +1,4 @@
+from unittest import mock
 from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
@@ -156,4 +157,61 @@ class SessionViewSetTests(TestCase):
         # make sure it's deleted
         self.assertFalse(
             SurveySession.objects.filter(pk=instance.id).exists()
-        )
\ No newline at end of file
+        )
+
+    def test_create_session_code_collision(self):
+        """ A code that's taken is never reused, another code is tried. """
+
+        other_user = User.objects.create_user('other user')
+        SurveySession.objects.create(
+            survey=self.survey, code=1234, owner=other_user
+        )
+
+        self.client.force_authenticate(self.user)
+        with mock.patch('random.randint', side_effect=[1234, 1234, 5678]):
+            response = self.client.post(
+                '/api/sessions/',
+                {"survey": str(self.survey.id)},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['code'], 5678)
+
+    def test_create_session_longer_codes(self):
+        """ Codes get longer once short codes keep colliding. """
+
+        other_user = User.objects.create_user('other user')
+        SurveySession.objects.create(
+            survey=self.survey, code=1234, owner=other_user
+        )
+
+        self.client.force_authenticate(self.user)
+        codes = [1234] * 10 + [12345]
+        with mock.patch('random.randint', side_effect=codes) as randint:
+            response = self.client.post(
+                '/api/sessions/',
+                {"survey": str(self.survey.id)},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['code'], 12345)
+        randint.assert_called_with(10000, 99999)
+
+    def test_create_session_code_reused(self):
+        """ Codes of deleted sessions are free again. """
+
+        other_user = User.objects.create_user('other user')
+        session = SurveySession.objects.create(
+            survey=self.survey, code=1234, owner=other_user
+        )
+        session.delete()
+
+        self.client.force_authenticate(self.user)
+        with mock.patch('random.randint', return_value=1234):
+            response = self.client.post(
+                '/api/sessions/',
+                {"survey": str(self.survey.id)},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['code'], 1234)
@@ -1,11 +1,20 @@
 from http import client
-from django.test import TestCase
+from django.contrib import admin
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory
+from io import StringIO
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
-from ..models import SurveySubmission, SurveySession
+from ..models import (SurveyResponse, SurveySubmission, SurveySession,
+                      SurveySessionSummary)
+from ..summarizer import (SubmissionSummarizer,
+                          AggregateSubmissionSummarizer,
+                          MaterializedSubmissionSummarizer)
+from ..cache import session_summary_version
+from .base import ClearCachesTestCase
 
 
-class SurveySubmissionSummaryTests(TestCase):
+class SurveySubmissionSummaryTests(ClearCachesTestCase):
 
     fixtures = ['test_summary_data.json']
 
@@ -361,3 +370,245 @@ class SurveySubmissionSummaryTests(TestCase):
             '/api/sessions/4wNwX6O/submissions/summarize/'
         )
         self.assertEqual(response.status_code, 401)
+
+    def test_summary_query_count(self):
+        """ The number of queries doesn't depend on the number of questions. """
+
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        submissions = SurveySubmission.objects.filter(session=session)
+
+        # the first summary builds the session's SurveySessionSummary
+        MaterializedSubmissionSummarizer(session, submissions)
+
+        # submission count, questions, choices, session summary, text answers
+        with self.assertNumQueries(5):
+            MaterializedSubmissionSummarizer(session, submissions)
+
+    def test_summary_etag(self):
+        """ Unchanged summaries are served from cache or as 304s. """
+
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(
+            '/api/sessions/4wNwX6O/submissions/summarize/'
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        data = response.data
+
+        # session with its survey, submission count and time
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                '/api/sessions/4wNwX6O/submissions/summarize/'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+        self.assertDictEqual(response.data, data)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                '/api/sessions/4wNwX6O/submissions/summarize/',
+                HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # deleting a submission changes the summary
+        response = self.client.delete(
+            '/api/sessions/4wNwX6O/submissions/wYx2LZ7/'
+        )
+        self.assertEqual(response.status_code, 204)
+
+        response = self.client.get(
+            '/api/sessions/4wNwX6O/submissions/summarize/',
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['submission_count'], 2)
+        etag = response['ETag']
+
+        # so does editing a question
+        response = self.client.patch(
+            '/api/surveys/Wl95e9L/questions/GajwyDE/',
+            {'title': 'New title'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(
+            '/api/sessions/4wNwX6O/submissions/summarize/',
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_summarizers_agree(self):
+        """ The in-memory and the aggregate summarizers give the same result. """
+
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        submissions = SurveySubmission.objects.filter(session=session)
+
+        self.assertDictEqual(
+            AggregateSubmissionSummarizer(session, submissions).data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+    def test_summarizers_agree_without_group(self):
+        """ Summaries without group_by_question are also the same. """
+
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        session.survey.group_by_question = None
+        session.survey.save()
+        submissions = SurveySubmission.objects.filter(session=session)
+
+        data = AggregateSubmissionSummarizer(session, submissions).data
+        self.assertIsNone(data['group_by_question'])
+        self.assertDictEqual(
+            data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+    def test_materialized_summary_is_updated(self):
+        """ Making and deleting submissions keeps the summary up to date. """
+
+        self.client.force_authenticate(self.user)
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        submissions = SurveySubmission.objects.filter(session=session)
+
+        # build the summary
+        response = self.client.get(
+            '/api/sessions/4wNwX6O/submissions/summarize/'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(
+            '/api/sessions/4wNwX6O/submissions/',
+            {
+                "responses": [
+                    {"question": "yO5lED9", "choice": "WKo1dyZ"},
+                    {"question": "R7jNpDG", "choice": "MgyreN6"},
+                    {"question": "GajwyDE", "text": "answer 4"},
+                    {"question": "O2VeYVd", "choice": "wGo71N5",
+                        "numeric_value": 2.0},
+                    {"question": "O2VeYVd", "choice": "DMNxbo0",
+                        "numeric_value": 5.0},
+                    {"question": "O2VeYVd", "choice": "54Only0",
+                        "numeric_value": 1.0},
+                    {"question": "vQVx1jW", "choice": "k2Odnya"}
+                ]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        new_submission_id = response.data['id']
+
+        response = self.client.get(
+            '/api/sessions/4wNwX6O/submissions/summarize/'
+        )
+        self.assertEqual(response.data['submission_count'], 4)
+        self.assertDictEqual(
+            response.data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+        for submission_id in [new_submission_id, 'wYx2LZ7']:
+            response = self.client.delete(
+                f'/api/sessions/4wNwX6O/submissions/{submission_id}/'
+            )
+            self.assertEqual(response.status_code, 204)
+
+            response = self.client.get(
+                '/api/sessions/4wNwX6O/submissions/summarize/'
+            )
+            self.assertDictEqual(
+                response.data,
+                SubmissionSummarizer(session, submissions).data
+            )
+
+    def test_materialized_summary_deleted_outside_api(self):
+        """ Submissions deleted with a queryset or a cascade are counted. """
+
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        submissions = SurveySubmission.objects.filter(session=session)
+        MaterializedSubmissionSummarizer(session, submissions)
+
+        SurveySubmission.objects.filter(pk='wYx2LZ7').delete()
+        self.assertDictEqual(
+            MaterializedSubmissionSummarizer(session, submissions).data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+        # responses are deleted along with their question
+        session.survey.questions.get(pk='GajwyDE').delete()
+        self.assertDictEqual(
+            MaterializedSubmissionSummarizer(session, submissions).data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+    def test_responses_in_admin(self):
+        """ Responses can only be viewed and deleted in the admin. """
+
+        request = RequestFactory().get('/admin/')
+        request.user = User.objects.create_superuser('admin')
+        response_admin = admin.site._registry[SurveyResponse]
+        self.assertFalse(response_admin.has_add_permission(request))
+        self.assertFalse(response_admin.has_change_permission(request))
+        self.assertTrue(response_admin.has_delete_permission(request))
+
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        submissions = SurveySubmission.objects.filter(session=session)
+        MaterializedSubmissionSummarizer(session, submissions)
+        version = session_summary_version(session)
+
+        response = SurveyResponse.objects.filter(session=session).first()
+        response_admin.delete_queryset(
+            request, SurveyResponse.objects.filter(pk=response.pk)
+        )
+        session.survey.refresh_from_db()
+        self.assertNotEqual(session_summary_version(session), version)
+        self.assertDictEqual(
+            MaterializedSubmissionSummarizer(session, submissions).data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+    def test_materialized_summary_group_changed(self):
+        """ The summary is rebuilt when group_by_question changes. """
+
+        session = SurveySession.objects.get(pk='4wNwX6O')
+        submissions = SurveySubmission.objects.filter(session=session)
+        MaterializedSubmissionSummarizer(session, submissions)
+
+        session.survey.group_by_question = None
+        session.survey.save()
+
+        self.assertDictEqual(
+            MaterializedSubmissionSummarizer(session, submissions).data,
+            SubmissionSummarizer(session, submissions).data
+        )
+
+    def test_rebuild_summaries_command(self):
+        """ rebuild_summaries rebuilds summaries that match live summaries. """
+
+        out = StringIO()
+        call_command('rebuild_summaries', stdout=out)
+        self.assertIn('4wNwX6O', out.getvalue())
+        self.assertIn('ok', out.getvalue())
+
+        out = StringIO()
+        call_command('rebuild_summaries', '4wNwX6O', '--check', stdout=out)
+        self.assertIn('ok', out.getvalue())
+
+    def test_rebuild_summaries_check(self):
+        """ --check reports missing summaries without building them. """
+
+        out, err = StringIO(), StringIO()
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_summaries', '4wNwX6O', '--check',
+                stdout=out, stderr=err
+            )
+        self.assertIn('does not match', err.getvalue())
+        self.assertFalse(
+            SurveySessionSummary.objects.filter(session='4wNwX6O').exists()
+        )
@@ -1,10 +1,18 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
-from ..models import SurveySubmission, SurveySession
+from ..models import (Survey, SurveyQuestion, SurveySession,
+                      SurveySubmission)
+from ..schema import clear_schema_cache
+from .base import ClearCachesTestCase, without_bulk_insert_returning
 
 
-class SurveySubmissionViewSetTests(TestCase):
+class SurveySubmissionViewSetTests(ClearCachesTestCase):
 
     fixtures = ['test_submission_data.json']
 
@@ -44,6 +52,170 @@ class SurveySubmissionViewSetTests(TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertListEqual(response.data['responses'], self.survey_responses)
 
+    def test_submit_bulk_inserts_responses(self):
+        """ All responses of a submission are written with one INSERT. """
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/sessions/Dy07DNq/submissions/',
+                {"responses": self.survey_responses},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        inserts = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('INSERT INTO "survey_surveyresponse"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            SurveySubmission.objects
+            .get(pk=response.data['id']).responses.count(),
+            len(self.survey_responses)
+        )
+
+    def test_submit_sets_response_session(self):
+        """ Responses carry their submission's session. """
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        session = SurveySession.objects.get(pk='Dy07DNq')
+        self.assertEqual(
+            session.responses.filter(submission=response.data['id']).count(),
+            len(self.survey_responses)
+        )
+
+    def test_submit_unknown_question(self):
+        """ Responses to questions not in the survey are rejected. """
+
+        self.survey_responses.append({"question": "nRjgVoq", "text": "nope"})
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_submit_other_survey_question(self):
+        """ Questions of other surveys are rejected by the response field. """
+
+        survey = Survey.objects.create(title='other survey')
+        question = SurveyQuestion.objects.create(
+            survey=survey, number=1, title='Why?', type='SA', required=False
+        )
+        self.survey_responses.append({"question": str(question.id), "text": "nope"})
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['responses'][-1]
+        self.assertIn('does not exist', str(errors['question'][0]))
+        self.assertEqual(SurveySubmission.objects.count(), 0)
+
+    def test_submit_schema_cached(self):
+        """ Questions and choices are only read for the first submission. """
+
+        def submit():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    '/api/sessions/Dy07DNq/submissions/',
+                    {"responses": self.survey_responses},
+                    format='json'
+                )
+            self.assertEqual(response.status_code, 201)
+            return [
+                q['sql'] for q in queries.captured_queries
+                if 'FROM "survey_surveyquestionchoice"' in q['sql']
+            ]
+
+        self.assertEqual(len(submit()), 1)
+        self.assertEqual(len(submit()), 0)
+
+        # the schema is also shared through Django's cache
+        clear_schema_cache()
+        self.assertEqual(len(submit()), 0)
+
+    def test_submit_schema_updated(self):
+        """ Changes to the questions are picked up by the next submission. """
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(
+            '/api/surveys/y09dl9W/questions/yO5lED9/',
+            {
+                "choices": [
+                    {"id": "m2OkayZ", "value": "A", "description": "Star Trek"},
+                    {"value": "C", "description": "Dune"},
+                ]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        new_choice = response.data['choices'][1]['id']
+        self.client.force_authenticate(None)
+
+        self.survey_responses[0]['choice'] = new_choice
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        # the removed choice isn't valid anymore
+        self.survey_responses[0]['choice'] = 'WKo1dyZ'
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_submit_schema_updated_outside_api(self):
+        """ Questions changed outside the API are picked up as well. """
+
+        Survey.objects.filter(pk='y09dl9W').update(draft=False)
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        # "Delete selected" the required multiple choice question
+        admin.site._registry[SurveyQuestion].delete_queryset(
+            None, SurveyQuestion.objects.filter(pk='yO5lED9')
+        )
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses[1:]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        # saved through the ORM
+        question = SurveyQuestion.objects.get(pk='GrjLWV2')
+        question.required = True
+        question.save()
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/',
+            {"responses": self.survey_responses[1:-1]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('is required', str(response.data))
+
     def test_submit_optional(self):
         """ Questions marked required=False can have no response """
 
@@ -219,3 +391,213 @@ class SurveySubmissionViewSetTests(TestCase):
 
         response = self.client.get('/api/sessions/Dy07DNq/submissions/')
         self.assertEqual(response.status_code, 200)
+
+    def test_bulk(self):
+        """ Valid submissions are created, invalid ones are reported. """
+
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            [
+                {"responses": self.survey_responses},
+                {"responses": self.survey_responses[:-1]},
+                {"responses": []},
+                "not a submission",
+            ],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            [error['index'] for error in response.data['errors']], [2, 3]
+        )
+        self.assertIn("is required", str(response.data['errors'][0]))
+
+        submissions = SurveySubmission.objects.filter(session='Dy07DNq')
+        self.assertEqual(submissions.count(), 2)
+        self.assertEqual(
+            sorted(s.responses.count() for s in submissions),
+            [len(self.survey_responses) - 1, len(self.survey_responses)]
+        )
+
+    def test_bulk_without_bulk_insert_returning(self):
+        """ Submissions can be bulk created on SQLite before 3.35. """
+
+        self.client.force_authenticate(self.user)
+
+        with without_bulk_insert_returning():
+            response = self.client.post(
+                '/api/sessions/Dy07DNq/submissions/bulk/',
+                [{"responses": self.survey_responses}] * 2,
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+
+        submissions = SurveySubmission.objects.filter(session='Dy07DNq')
+        self.assertEqual(
+            [s.responses.count() for s in submissions],
+            [len(self.survey_responses)] * 2
+        )
+
+    def test_bulk_ndjson(self):
+        """ Submissions can also be uploaded as newline delimited JSON. """
+
+        self.client.force_authenticate(self.user)
+
+        lines = [json.dumps({"responses": self.survey_responses})] * 3
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            '\n'.join(lines) + '\n',
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['errors'], [])
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            lines[0] + '\n{"responses": ',
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("line 2", str(response.data))
+
+    def test_bulk_invalid(self):
+        """ Nothing valid to create is a bad request. """
+
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            [{"responses": []}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            {"responses": self.survey_responses},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_updates_summary(self):
+        """ Imported submissions are counted in the session summary. """
+
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(
+            '/api/sessions/Dy07DNq/submissions/summarize/'
+        )
+        self.assertEqual(response.data['submission_count'], 0)
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            [{"responses": self.survey_responses}] * 3,
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(
+            '/api/sessions/Dy07DNq/submissions/summarize/'
+        )
+        self.assertEqual(response.data['submission_count'], 3)
+        question_summary = next(
+            s for s in response.data['question_summary']
+            if s['question']['id'] == 'yO5lED9'
+        )
+        self.assertEqual(question_summary['all']['count']['m2OkayZ'], 3)
+
+    def test_bulk_permissions(self):
+        """ Only authenticated users can import submissions. """
+
+        response = self.client.post(
+            '/api/sessions/Dy07DNq/submissions/bulk/',
+            [{"responses": self.survey_responses}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_export(self):
+        """ Submissions can be exported as CSV and NDJSON. """
+
+        for responses in [self.survey_responses, self.survey_responses[:-1]]:
+            response = self.client.post(
+                '/api/sessions/Dy07DNq/submissions/',
+                {"responses": responses},
+                format='json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(
+            '/api/sessions/Dy07DNq/submissions/export.ndjson/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2)
+        self.assertDictEqual(rows[0]['responses'], {
+            "yO5lED9": "A",
+            "R7jNpDG": ["A", "B"],
+            "dBjywDL": "2",
+            "Lo5MY5R": 8.0,
+            "GajwyDE": "apple",
+            "O2VeYVd": "Describe the city you live in.",
+            "vQVx1jW": ["A", "B", "C"],
+            "GrjLWV2": "optional",
+        })
+        self.assertNotIn("GrjLWV2", rows[1]['responses'])
+
+        response = self.client.get(
+            '/api/sessions/Dy07DNq/submissions/export.csv/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        header, *csv_rows = csv.reader(io.StringIO(content))
+        self.assertEqual(header[:2], ['id', 'submission_time'])
+        self.assertEqual(len(header), 2 + 8)
+        self.assertEqual(len(csv_rows), 2)
+        self.assertEqual(csv_rows[0][0], rows[0]['id'])
+        self.assertIn('A;B', csv_rows[0])
+        self.assertEqual(csv_rows[1][-1], '')
+
+    def test_export_permissions(self):
+        """ Only authenticated users can export submissions. """
+
+        response = self.client.get(
+            '/api/sessions/Dy07DNq/submissions/export.csv/'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_cursor_pagination(self):
+        """ Submissions can be paged through with cursors. """
+
+        session = SurveySession.objects.get(id='Dy07DNq')
+        submissions = SurveySubmission.objects.bulk_create([
+            SurveySubmission(session=session) for _ in range(3)
+        ])
+        submissions += [
+            SurveySubmission.objects.create(session=session) for _ in range(2)
+        ]
+
+        self.client.force_authenticate(self.user)
+
+        ids = []
+        response = self.client.get(
+            '/api/sessions/Dy07DNq/submissions/?pagination=cursor&limit=2'
+        )
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(s['id'] for s in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertListEqual(ids, [str(s.id) for s in submissions])
@@ -403,4 +403,39 @@ class SurveyViewSetTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertSetEqual(
             self.get_survey_id_set(response.data), set()
-        )
\ No newline at end of file
+        )
+
+    def test_list_survey_cursor_pagination(self):
+        """
+        Surveys can be paged through with cursors in created_at order.
+        """
+        surveys = [
+            Survey.objects.create(title=f'survey {i}') for i in range(5)
+        ]
+
+        ids = []
+        response = self.client.get('/api/surveys/?pagination=cursor&limit=2')
+        self.assertNotIn('count', response.data)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(survey['id'] for survey in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertListEqual(ids, [survey.id for survey in surveys])
+
+        # the total is only counted if asked for
+        response = self.client.get(
+            '/api/surveys/?pagination=cursor&limit=2&count=true'
+        )
+        self.assertEqual(response.data['count'], 5)
+
+        # the other query parameters still work
+        response = self.client.get(
+            '/api/surveys/?pagination=cursor&keyword=survey 3'
+        )
+        self.assertSetEqual(
+            self.get_survey_id_set(response.data), {surveys[3].id}
+        )
@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from survey.models import Survey, SurveyQuestion, SurveyQuestionChoice
+from .base import without_bulk_insert_returning
 
 
 class DuplicateSurveyViewSetTests(TestCase):
@@ -160,4 +161,102 @@ class DuplicateSurveyViewSetTests(TestCase):
         new_group_by_question = SurveyQuestion.objects.filter(id=new_group_by_question)
 
         # check that the new group by question asks for the group
-        self.assertEqual(list(new_group_by_question)[0].title, 'Which Group are you in?')
\ No newline at end of file
+        self.assertEqual(list(new_group_by_question)[0].title, 'Which Group are you in?')
+
+    def test_clone(self):
+        """ Many surveys can be copied at once. """
+        self.client.force_authenticate(self.user)
+
+        other_survey = Survey.objects.create(title='other survey')
+
+        response = self.client.post(
+            '/api/surveys/clone/',
+            {'surveys': [str(self.survey.id), str(other_survey.id)], 'copies': 3},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        mapping = response.data['surveys']
+        self.assertSetEqual(
+            set(mapping), {str(self.survey.id), str(other_survey.id)}
+        )
+        for copy_ids in mapping.values():
+            self.assertEqual(len(copy_ids), 3)
+
+        for copy_id in mapping[str(self.survey.id)]:
+            copy = Survey.objects.get(pk=copy_id)
+            self.assertEqual(copy.title, 'test survey')
+            self.assertTrue(copy.draft)
+            question = copy.questions.get()
+            self.assertEqual(question.title, '1 + 1 = ?')
+            self.assertEqual(question.choices.get().description, '1')
+
+        for copy_id in mapping[str(other_survey.id)]:
+            copy = Survey.objects.get(pk=copy_id)
+            self.assertEqual(copy.title, 'other survey')
+            self.assertFalse(copy.questions.exists())
+
+    def test_clone_without_bulk_insert_returning(self):
+        """ Surveys can be copied on SQLite versions before 3.35. """
+        self.client.force_authenticate(self.user)
+
+        self.survey.group_by_question = self.question
+        self.survey.save()
+
+        with without_bulk_insert_returning():
+            response = self.client.post(
+                '/api/surveys/clone/',
+                {'surveys': [str(self.survey.id)], 'copies': 2},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+
+        for copy_id in response.data['surveys'][str(self.survey.id)]:
+            copy = Survey.objects.get(pk=copy_id)
+            question = copy.questions.get()
+            self.assertEqual(copy.group_by_question, question)
+            self.assertEqual(question.choices.get().description, '1')
+
+    def test_clone_invalid(self):
+        """ Nothing is copied unless all surveys exist. """
+
+        response = self.client.post(
+            '/api/surveys/clone/',
+            {'surveys': [str(self.survey.id)]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_authenticate(self.user)
+
+        deleted_id = str(self.survey.id)
+        self.survey.delete()
+        other_survey = Survey.objects.create(title='other survey')
+        response = self.client.post(
+            '/api/surveys/clone/',
+            {'surveys': [str(other_survey.id), deleted_id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(deleted_id, str(response.data))
+        self.assertEqual(Survey.objects.count(), 1)
+
+        response = self.client.post(
+            '/api/surveys/clone/',
+            {'surveys': [str(other_survey.id)], 'copies': 0},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        # at most 1500 copies in total
+        surveys = [other_survey] + [
+            Survey.objects.create(title=f'survey {i}') for i in range(15)
+        ]
+        response = self.client.post(
+            '/api/surveys/clone/',
+            {'surveys': [str(s.id) for s in surveys], 'copies': 100},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1500', str(response.data))
+        self.assertEqual(Survey.objects.count(), 16)
@@ -7,6 +7,7 @@ from .views import (
     SurveySessionViewSet
 )
 from rest_framework_nested import routers
+from .routers import NestedBulkRouter
 
 router = routers.DefaultRouter()
 router.register(
@@ -19,7 +20,7 @@ router.register(
     SurveySessionViewSet,
     basename='session'
 )
-survey_router = routers.NestedSimpleRouter(
+survey_router = NestedBulkRouter(
     router,
     r'surveys',
     lookup='survey'
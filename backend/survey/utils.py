@@ -1,6 +1,10 @@
 from http.client import NOT_FOUND
 from django.conf import settings
+from django.db import connections, router
+from collections import OrderedDict
 import hashlib
+import threading
+import time
 from rest_framework.exceptions import NotFound
 
 
@@ -42,3 +46,86 @@ def query_param_to_bool(s):
     elif s.lower() == 'false':
         return False
     return None
+
+
+class LRUCache:
+    """
+    A thread safe in-process cache that holds at most `maxsize` items and
+    evicts the least recently used one when it's full. If `timeout` is
+    given, items also expire that many seconds after they're set.
+
+    Hits and misses of get are counted, see stats.
+    """
+
+    def __init__(self, maxsize=128, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        # key -> (value, expiry time or None)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            value, expires = self._items[key]
+            if expires is not None and expires <= time.monotonic():
+                del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires = None
+        if self.timeout is not None:
+            expires = time.monotonic() + self.timeout
+        with self._lock:
+            self._items[key] = (value, expires)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """ Returns the size of the cache and its hit rate so far. """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def bulk_create_with_pks(model, objs):
+    """
+    Inserts model instances and sets their primary keys, so other rows can
+    refer to them. Uses one bulk insert if the database returns primary
+    keys from it (PostgreSQL, SQLite 3.35+). Otherwise the instances are
+    saved one at a time.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
@@ -1,39 +1,60 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import viewsets, mixins, status
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 import random
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Survey, SurveyQuestion, SurveyQuestionChoice, SurveySubmission
+from .models import Survey, SurveyQuestion, SurveySubmission
 from .serializers import (
     SurveySerializer,
+    SurveyCloneSerializer,
     NestedSurveyQuestionSerializer,
+    BulkSurveyQuestionSerializer,
     NestedSurveySubmissionSerializer,
     SurveySessionSerializer
 )
 from .models import Survey, SurveyQuestion, SurveySubmission, SurveySession
 from .utils import handle_invalid_hashid, query_param_to_bool
-from .permissions import IsAuthenticatedOrCreateOnly
+from .permissions import (IsAuthenticatedOrCreateOnly, IsOwnerOrReadOnly,
+                          IsParentOwner, IsParentOwnerOrCreateOnly)
 from .exceptions import BadQueryParameter
-from .summarizer import SubmissionSummarizer
-
-# creates another instance of a model with all the same fields
-# except for id
-
-
-def duplicate_instance(instance):
-    instance.pk = None
-    instance._state.adding = True
-    instance.save()
+from .export import SubmissionExporter
+from .fast_serializers import serialize_submissions, submission_values
+from .cloning import clone_surveys, duplicate_survey
+from .rendering import get_question_tree
+from elcform.pagination import CursorOrLimitOffsetPagination
+from .parsers import NDJSONParser
+from .summarizer import MaterializedSubmissionSummarizer
+from .cache import (get_session_by_code, join_cache_key,
+                    session_summary_version, summary_cache_key)
 
 
 class NestedViewMixIn:
     """
     Sets self.parent_instance based on captured parent pk.
+
+    The parent is looked up once per request in get_parent_queryset(),
+    which only loads `parent_only_fields` if they are given. Child
+    querysets and serializers should use self.parent_instance instead of
+    looking it up again.
+
+    If `parent_owner_field` is set, the parent's owner id is loaded along
+    with the parent (following relations with select_related), so
+    permissions like IsParentOwner don't need another query.
     """
     parent_model_queryset = None
     parent_pk_name = None
+    # the fields of the parent to load (see QuerySet.only), None for all
+    parent_only_fields = None
+    # the parent's foreign key to its owner, e.g. 'owner' or 'survey__owner'
+    parent_owner_field = None
 
     def initial(self, request, *args, **kwargs):
 
@@ -47,17 +68,45 @@ class NestedViewMixIn:
             % self.__class__.__name__
         )
 
+        self.parent_instance = get_object_or_404(
+            self.get_parent_queryset(),
+            pk=self.kwargs[self.parent_pk_name]
+        )
+
+        super().initial(request, *args, **kwargs)
+
+    def get_parent_queryset(self):
         queryset = self.parent_model_queryset
         if isinstance(queryset, QuerySet):
             # Ensure queryset is re-evaluated on each request.
             queryset = queryset.all()
 
-        self.parent_instance = get_object_or_404(
-            queryset,
-            pk=self.kwargs[self.parent_pk_name]
-        )
+        only_fields = self.get_parent_only_fields()
+        if self.parent_owner_field is not None:
+            related = self.parent_owner_field.rpartition('__')[0]
+            if related:
+                queryset = queryset.select_related(related)
+            if only_fields is not None:
+                only_fields = (*only_fields, self.parent_owner_field)
+        if only_fields is not None:
+            queryset = queryset.only(*only_fields)
+        return queryset
 
-        super().initial(request, *args, **kwargs)
+    def get_parent_only_fields(self):
+        return self.parent_only_fields
+
+    def get_parent_owner_id(self):
+        """
+        Returns the id of the parent's owner, read from the parent already
+        loaded, or None if the parent has no owner.
+        """
+        if self.parent_owner_field is None:
+            return None
+        *path, name = self.parent_owner_field.split('__')
+        instance = self.parent_instance
+        for related in path:
+            instance = getattr(instance, related)
+        return getattr(instance, instance._meta.get_field(name).attname)
 
 
 class SurveyViewSet(viewsets.ModelViewSet):
@@ -165,6 +214,25 @@ class SurveyViewSet(viewsets.ModelViewSet):
     }
     ```
 
+    For large lists, use cursor pagination instead by adding `pagination=cursor`.
+    Pages are ordered by `created_at` and follow each other through the `next`
+    and `previous` links, which cost the same no matter how deep the page is.
+    `limit` sets the page size. The total is only counted if `count=true` is
+    given.
+
+    ``` javascript
+    // GET /api/surveys/?pagination=cursor&limit=2
+
+    // HTTP 200 OK
+    {
+        "next": "http://127.0.0.1:8000/api/surveys/?cursor=cD0yMDIyLTAy&limit=2&pagination=cursor",
+        "previous": null,
+        "results": [
+            // the first 2 surveys
+        ]
+    }
+    ```
+
     You can use query parameters `keyword` to limit results to all surveys that
     have the keyword in their titles.
 
@@ -251,7 +319,7 @@ class SurveyViewSet(viewsets.ModelViewSet):
 
     To duplicate a specific survey, `POST /api/surveys/<id>/duplicate/`.  
 
-    > Note: duplicating a survey also duplicates all associated questions and responses.  
+    > Note: duplicating a survey also duplicates all associated questions and choices.  
 
     ``` javascript
     // POST /api/surveys/x5zMkQe/duplicate/
@@ -266,39 +334,62 @@ class SurveyViewSet(viewsets.ModelViewSet):
         "created_at": "2022-02-14T02:01:16.168116Z"
     }
     ```
+
+    ## Clone Surveys
+
+    To make copies of many surveys at once, `POST /api/surveys/clone/` with
+    a list of survey ids (at most 100) and the number of `copies` (at most
+    100, defaults to 1) to make of each, up to 1500 copies in total. Like
+    duplicates, the copies are drafts and include all questions and
+    choices. Either all copies are made or none are.  
+
+    The response maps the ids of the original surveys to the ids of their
+    copies.  
+
+    ``` javascript
+    // POST /api/surveys/clone/
+    {
+        "surveys": ["x5zMkQe", "ZL9AOn3"],
+        "copies": 2
+    }
+
+    // HTTP 201 CREATED
+    {
+        "surveys": {
+            "x5zMkQe": ["oxz3r94", "13zlXze"],
+            "ZL9AOn3": ["vrzkOzD", "8bzNkQE"]
+        }
+    }
+    ```
+
     # Related Endpoints
 
     To access a survey's questions, use `/api/surveys/<id>/questions/`.
     """
     serializer_class = SurveySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CursorOrLimitOffsetPagination
+    cursor_ordering = ('created_at', 'id')
 
     @action(detail=True, methods=['post'])
     def duplicate(self, request, pk=None):
-        survey = self.get_object()
-        id = survey.id
-        duplicate_instance(survey)
-        survey.draft = True
-        survey.save()
-
-        questions = SurveyQuestion.objects.filter(survey=id).all()
-
-        for q in questions:
-            q_id = q.id
-            q.survey = survey
-            duplicate_instance(q)
-
-            if survey.group_by_question is not None and survey.group_by_question.id == q_id:
-                survey.group_by_question = q
-                survey.save()
-
-            choices = SurveyQuestionChoice.objects.filter(question=q_id).all()
-            for c in choices:
-                c.question = q
-                duplicate_instance(c)
-
+        survey = duplicate_survey(self.get_object())
         return Response(SurveySerializer(instance=survey).data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def clone(self, request):
+        serializer = SurveyCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        clones = clone_surveys(
+            serializer.validated_data['surveys'],
+            serializer.validated_data['copies']
+        )
+        mapping = {
+            str(s_id): [str(survey.id) for survey in copies]
+            for s_id, copies in clones.items()
+        }
+        return Response({'surveys': mapping}, status=status.HTTP_201_CREATED)
+
     def get_queryset(self):
         queryset = Survey.objects.all()
 
@@ -721,6 +812,9 @@ class NestedSurveyQuestionViewSet(NestedViewMixIn, viewsets.ModelViewSet):
     ]
     ```
 
+    > Note: the questions of published (non-draft) surveys are cached until
+    > the survey or its questions are edited.
+
 
 
     ## Fetch Question
@@ -849,6 +943,57 @@ class NestedSurveyQuestionViewSet(NestedViewMixIn, viewsets.ModelViewSet):
 
     // HTTP 204 No Content
     ```
+
+    ## Replace All Questions
+
+    To save all questions of a survey at once (e.g. from the survey editor),
+    `PUT /api/surveys/<survey_id>/questions/` with the complete list of questions.  
+    Only authenticated users can replace questions.  
+
+    Questions with an `id` update the existing question with that id and
+    questions without one are created. Existing questions that aren't in the
+    list are deleted (with their responses). Choices are edited like in
+    [Edit Question](#edit-question). Everything is validated before anything
+    is saved, and the changes are saved in one transaction.
+
+    ``` javascript
+    // PUT /api/surveys/<survey_id>/questions/
+    [
+        {
+            "id": "OmjRaVR", // an existing question
+            "number": 1,
+            "title": "Which is better?",
+            "required": true,
+            "type": "MC",
+            "choices": [
+                {"id": "k2Odnya", "value": "A", "description": "Star Trek"},
+                {"value": "B", "description": "Star Wars"}
+            ]
+        },
+        {
+            // a new question
+            "number": 2,
+            "title": "Why?",
+            "required": false,
+            "type": "PA"
+        }
+    ]
+
+    // HTTP 200 OK
+    // the survey's questions, ordered by number
+    [
+        {
+            "id": "OmjRaVR",
+            "number": 1,
+            // ...
+        },
+        {
+            "id": "yO5lED9",
+            "number": 2,
+            // ...
+        }
+    ]
+    ```
     """
     serializer_class = NestedSurveyQuestionSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -859,14 +1004,42 @@ class NestedSurveyQuestionViewSet(NestedViewMixIn, viewsets.ModelViewSet):
     # before .get, .post, etc. are called.
     parent_model_queryset = Survey.objects.all()
     parent_pk_name = 'survey_pk'
+    # enough to serve (and cache) the questions and to touch the survey
+    parent_only_fields = ('id', 'draft', 'updated_at')
 
-    @handle_invalid_hashid('Survey')
     def get_queryset(self):
         return SurveyQuestion.objects\
-            .select_related('survey')\
-            .filter(survey=self.kwargs['survey_pk'])\
+            .filter(survey=self.parent_instance)\
             .prefetch_related('choices')
 
+    def list(self, request, *args, **kwargs):
+        # questions of published surveys are served from the cache
+        return Response(get_question_tree(self.parent_instance))
+
+    def replace(self, request, *args, **kwargs):
+        serializer = BulkSurveyQuestionSerializer(
+            self.get_queryset(),
+            data=request.data,
+            many=True,
+            context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        # touch the survey in the same transaction, so new questions are
+        # never committed while cached copies of the old ones stay valid
+        with transaction.atomic():
+            serializer.save()
+            self.parent_instance.touch()
+
+        questions = get_question_tree(self.parent_instance)
+        return Response(sorted(questions, key=lambda q: q['number']))
+
+    # deleting a question also changes the survey (saving a question
+    # touches the survey through a post_save receiver, see signals.py)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.parent_instance.touch()
+
 
 class NestedSurveySubmissionViewSet(NestedViewMixIn,
                                     mixins.CreateModelMixin,
@@ -1152,7 +1325,7 @@ class NestedSurveySubmissionViewSet(NestedViewMixIn,
     ## List Submissions
 
     You can list all submissions of a specific sessions.  
-    Only authenticated users can list submissions.  
+    Only the session's owner can list submissions.  
 
     ``` javascript
     // GET /api/sessions/<sessions_id>/submissions/
@@ -1221,10 +1394,28 @@ class NestedSurveySubmissionViewSet(NestedViewMixIn,
     }
     ```
 
+    Submissions are paginated with `limit` and `offset` like surveys. Add
+    `pagination=cursor` to page through them by `submission_time` with
+    cursors instead, which is much faster for sessions with many
+    submissions (add `count=true` to also get the total).
+
+    ``` javascript
+    // GET /api/sessions/<sessions_id>/submissions/?pagination=cursor&limit=100
+
+    // HTTP 200 OK
+    {
+        "next": "http://127.0.0.1:8000/api/sessions/<sessions_id>/submissions/?cursor=cD0yMDIy&limit=100&pagination=cursor",
+        "previous": null,
+        "results": [
+            // the first 100 submissions
+        ]
+    }
+    ```
+
     ## Fetch Submission
 
     To fetch a specific submission, `GET /api/sessions/<sessions_id>/submissions/<submission_id>/`.  
-    Only authenticated users can fetch submissions.  
+    Only the session's owner can fetch submissions.  
 
     ``` javascript
     // GET /api/surveys/<survey_id>/questions/7rZoWZ4/
@@ -1286,10 +1477,69 @@ class NestedSurveySubmissionViewSet(NestedViewMixIn,
     }
     ```
 
+    ## Import Submissions
+
+    To make many submissions at once (e.g. collected offline),
+    `POST /api/sessions/<sessions_id>/submissions/bulk/`.  
+    Only the session's owner can import submissions.  
+
+    The body is either a JSON list of submissions or newline delimited JSON
+    (`Content-Type: application/x-ndjson`) with one submission per line.
+    Each submission is validated like a single submission. Valid submissions
+    are created even if others are invalid; the errors of the invalid ones
+    are reported with their (0-based) position in the input.
+
+    ``` javascript
+    // POST /api/sessions/4wNwX6O/submissions/bulk/
+    [
+        {"responses": [{"question": "yO5lED9", "choice": "m2OkayZ"}, /* ... */]},
+        {"responses": [{"question": "yO5lED9", "choice": "WKo1dyZ"}, /* ... */]},
+        {"responses": []}
+    ]
+
+    // HTTP 201 Created
+    {
+        "created": 2,
+        "errors": [
+            {
+                "index": 2,
+                "errors": {
+                    "non_field_errors": ["Question yO5lED9 is required."]
+                }
+            }
+        ]
+    }
+    ```
+
+    If none of the submissions are valid, the response is a `400 Bad Request`
+    with the same body.
+
+    ## Export Submissions
+
+    To download all submissions of a session,
+    `GET /api/sessions/<sessions_id>/submissions/export.csv/` or
+    `GET /api/sessions/<sessions_id>/submissions/export.ndjson/`.  
+    Only the session's owner can export submissions.  
+
+    The export has one row per submission and one column per question
+    (ordered by question number). Choice questions are exported as the
+    chosen choices' `value`s, checkboxes and ranking questions as lists of
+    them (ranked first to last), scale questions as `numeric_value`s and
+    text questions as `text`s. In CSV files, lists are joined with `;`.
+
+    ``` javascript
+    // GET /api/sessions/4wNwX6O/submissions/export.ndjson/
+
+    // HTTP 200 OK
+    // Content-Type: application/x-ndjson
+    {"id": "5JAbY0b", "submission_time": "2022-02-19T05:01:12.441000+00:00", "responses": {"yO5lED9": "A", "R7jNpDG": ["A", "B"], "Lo5MY5R": 8.0, ...}}
+    {"id": "Wr0xG9e", "submission_time": "2022-02-19T05:03:47.906000+00:00", "responses": {"yO5lED9": "B", "R7jNpDG": ["B"], "Lo5MY5R": 6.0, ...}}
+    ```
+
     ## Delete Submission
 
     To delete a specific submission, `DELETE /api/sessions/<sessions_id>/submissions/<submission_id>/`.  
-    Only authenticated users can delete submissions.  
+    Only the session's owner can delete submissions.  
 
     ``` javascript
     // DELETE /api/sessions/<sessions_id>/submissions/<submission_id>/
@@ -1300,7 +1550,7 @@ class NestedSurveySubmissionViewSet(NestedViewMixIn,
     ## Submission Summary
 
     To get a summary of all submissions,  `GET /api/sessions/<sessions_id>/summarize/`.  
-    Only authenticated users can fetch summaries.  
+    Only the session's owner can fetch summaries.  
 
     ``` javascript
     // GET /api/sessions/4wNwX6O/submissions/summarize/
@@ -1322,6 +1572,18 @@ class NestedSurveySubmissionViewSet(NestedViewMixIn,
     }
     ```
 
+    Summaries include an `ETag` header that changes when a submission is made
+    or deleted, or when the survey or its questions are edited. To poll for
+    changes cheaply, send the last `ETag` in an `If-None-Match` header. If the
+    summary hasn't changed, the response is a `304 Not Modified` without body.
+
+    ``` javascript
+    // GET /api/sessions/4wNwX6O/submissions/summarize/
+    // If-None-Match: "4d2b4c5c0b8e1f0a6f8e4f2f4f2e3a0a9d8c7b6a"
+
+    // HTTP 304 Not Modified
+    ```
+
     ### Submission Summary Object
 
     | Field               | Type                      | Description                                                                                  |
@@ -1349,29 +1611,128 @@ class NestedSurveySubmissionViewSet(NestedViewMixIn,
     | `ranking`                      | `{string: StatisticObject}` | `'RK'`                 | The statistics for each thing to be ranked. The keys correspond to the choices' ids. The `StatisticObject` includes `min`, `max`, `mean`, `median`, similar to that of `'MC'` questions. |
     """
     serializer_class = NestedSurveySubmissionSerializer
-    permission_classes = [IsAuthenticatedOrCreateOnly]
+    permission_classes = [IsAuthenticatedOrCreateOnly, IsParentOwnerOrCreateOnly]
+    pagination_class = CursorOrLimitOffsetPagination
+    cursor_ordering = ('submission_time', 'id')
+    summarizer_class = MaterializedSubmissionSummarizer
+    # number of submissions validated and inserted at a time by bulk
+    bulk_batch_size = 500
 
     # NestedViewMixIn will set
-    # self.parent_instance = Survey.objects.get(pk=self.kwargs['survey_pk'])
+    # self.parent_instance = SurveySession.objects.get(pk=self.kwargs['session_pk'])
     # before .get, .post, etc. are called.
-    parent_model_queryset = SurveySession.objects.all()
+    parent_model_queryset = SurveySession.objects.select_related('survey')
     parent_pk_name = 'session_pk'
+    # only the session's owner can see or import its submissions
+    parent_owner_field = 'owner'
+    # enough to validate submissions (see survey.schema) and to update the
+    # session's summary
+    parent_only_fields = (
+        'id', 'survey', 'survey__id', 'survey__draft', 'survey__updated_at',
+        'survey__group_by_question'
+    )
+
+    def get_parent_only_fields(self):
+        if self.action == 'summarize':
+            # summaries include the whole survey
+            return None
+        return super().get_parent_only_fields()
 
-    @handle_invalid_hashid('Survey')
     def get_queryset(self):
-        return SurveySubmission.objects\
-            .filter(session=self.kwargs['session_pk'])\
-            .prefetch_related('responses')\
-            .prefetch_related('responses__question')
+        queryset = SurveySubmission.objects\
+            .filter(session=self.parent_instance)
+        # only a fetched submission is serialized with its responses, list
+        # reads values() rows and destroy reads the responses itself
+        if self.action == 'retrieve':
+            queryset = queryset\
+                .prefetch_related('responses')\
+                .prefetch_related('responses__question')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # serialized from .values() rows, see survey.fast_serializers
+        rows = submission_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_submissions(page))
+        return Response(serialize_submissions(rows))
+
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[JSONParser, NDJSONParser],
+        permission_classes=[IsAuthenticated, IsParentOwner]
+    )
+    def bulk(self, request, session_pk=None):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of submissions.')
+
+        # one serializer validates all items, so the survey is loaded once
+        serializer = self.get_serializer()
+        created = 0
+        errors = []
+        for start in range(0, len(items), self.bulk_batch_size):
+            batch = items[start:start + self.bulk_batch_size]
+            valid = []
+            for index, item in enumerate(batch, start):
+                try:
+                    valid.append(serializer.run_validation(item))
+                except ValidationError as exc:
+                    errors.append({'index': index, 'errors': exc.detail})
+            created += len(serializer.create_many(valid))
+
+        response_status = status.HTTP_400_BAD_REQUEST \
+            if errors and not created else status.HTTP_201_CREATED
+        return Response(
+            {'created': created, 'errors': errors},
+            status=response_status
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'export\.(?P<export_format>csv|ndjson)'
+    )
+    def export(self, request, session_pk=None, export_format=None):
+        exporter = SubmissionExporter(self.parent_instance)
+        if export_format == 'csv':
+            rows = exporter.csv_rows()
+            content_type = 'text/csv'
+        else:
+            rows = exporter.ndjson_rows()
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        filename = f'submissions-{self.parent_instance.id}.{export_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
     @action(detail=False, methods=['get'])
     def summarize(self, request, session_pk=None):
 
         session = self.parent_instance
-        submission_queryset = self.get_queryset()
-        summarizer = SubmissionSummarizer(session, submission_queryset)
+        version = session_summary_version(session)
+        etag = quote_etag(version)
+        headers = {'ETag': etag}
 
-        return Response(summarizer.data)
+        # the client's copy is still up to date
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            if etag in etags or '*' in etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED,
+                                headers=headers)
+
+        cache_key = summary_cache_key(version)
+        data = cache.get(cache_key)
+        if data is None:
+            submission_queryset = self.get_queryset()
+            summarizer = self.summarizer_class(session, submission_queryset)
+            data = summarizer.data
+            cache.set(cache_key, data)
+
+        return Response(data, headers=headers)
 
 
 class SurveySessionViewSet(mixins.CreateModelMixin,
@@ -1477,7 +1838,8 @@ class SurveySessionViewSet(mixins.CreateModelMixin,
 
     ## Delete Session
 
-    To delete a session and all its responses, `DELETE /api/sessions/<session_id>/`.
+    To delete a session and all its responses, `DELETE /api/sessions/<session_id>/`.  
+    Only the session's owner can delete it.
 
     ``` javascript
     // DELETE /api/sessions/vrzkOzD/
@@ -1492,7 +1854,9 @@ class SurveySessionViewSet(mixins.CreateModelMixin,
     """
     serializer_class = SurveySessionSerializer
     # we can change this later
-    permission_classes = [IsAuthenticatedOrReadOnly]
+    permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    # number of random codes to try before using longer codes
+    code_attempts = 10
 
     @handle_invalid_hashid('Survey')
     def get_queryset(self):
@@ -1509,13 +1873,29 @@ class SurveySessionViewSet(mixins.CreateModelMixin,
         return queryset
 
     def perform_create(self, serializer):
+        """
+        Saves the session with a random unused code.
+
+        A code is reserved by inserting the session and trying another code
+        if the insert violates the code's unique constraint, so concurrent
+        requests can't end up with the same code and there's no lookup
+        before the insert. Codes of deleted sessions can be reused. After
+        `code_attempts` collisions, codes get one digit longer.
+        """
         min_val, max_val = 1000, 10000
         while True:
-            for _ in range(10):
+            for _ in range(self.code_attempts):
                 code = random.randint(min_val, max_val - 1)
-                if not SurveySession.objects.filter(code=code).exists():
-                    serializer.save(code=code)
+                try:
+                    # a savepoint, so a failed insert doesn't break
+                    # the surrounding transaction
+                    with transaction.atomic():
+                        serializer.save(code=code)
                     return
+                except IntegrityError:
+                    # only retry if the code was the problem
+                    if not SurveySession.objects.filter(code=code).exists():
+                        raise
             min_val *= 10
             max_val *= 10
 
@@ -1547,6 +1927,43 @@ class CodeToSessionViewSet(mixins.RetrieveModelMixin,
     }
     ```
 
+    > Note: lookups are cached. A deleted session may still be found for
+    > up to 10 seconds by servers other than the one that deleted it.
+
+    ## Join Session by Code
+
+    To fetch everything needed to fill out the survey of a session in one
+    request, `GET /api/codes/<code>/join/`. The response includes the
+    session, its survey and the survey's questions (ordered by `number`)
+    with their choices.
+
+    ``` javascript
+    // GET /api/codes/1234/join/
+
+    // HTTP 200 OK
+    {
+        "session": {
+            "id": "Dy07DNq",
+            "code": 1234,
+            "survey": "Wl95e9L"
+        },
+        "survey": {
+            "id": "Wl95e9L",
+            "title": "Survey Name",
+            // ...
+        },
+        "questions": [
+            {
+                "id": "yO5lED9",
+                "number": 1,
+                "title": "Which is better?",
+                // ...
+            },
+            // ...
+        ]
+    }
+    ```
+
     # Related Endpoints
 
     To create, fetch, list, delete sessions, see [survey session endpoint](/api/sessions/).
@@ -1556,3 +1973,44 @@ class CodeToSessionViewSet(mixins.RetrieveModelMixin,
     permission_classes = [IsAuthenticatedOrReadOnly]
     queryset = SurveySession.objects.all()
     lookup_field = 'code'
+
+    def retrieve(self, request, *args, **kwargs):
+        # cache by the number, so e.g. 01234 and 1234 share an entry that's
+        # invalidated when the session is deleted
+        try:
+            code = int(self.kwargs[self.lookup_field])
+        except ValueError:
+            raise NotFound()
+        self.kwargs[self.lookup_field] = code
+
+        # the whole class joins at once, so lookups are cached
+        data = get_session_by_code(
+            code,
+            lambda: dict(self.get_serializer(self.get_object()).data)
+        )
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def join(self, request, code=None):
+        session = get_object_or_404(
+            SurveySession.objects.select_related('survey'),
+            code=code
+        )
+        survey = session.survey
+
+        # the key changes whenever the survey is edited, so payloads of
+        # published surveys are cached without a timeout
+        cache_key = join_cache_key(session)
+        data = cache.get(cache_key) if not survey.draft else None
+        if data is None:
+            questions = sorted(
+                get_question_tree(survey), key=lambda q: q['number']
+            )
+            data = {
+                'session': SurveySessionSerializer(session).data,
+                'survey': SurveySerializer(survey).data,
+                'questions': questions,
+            }
+            if not survey.draft:
+                cache.set(cache_key, data, timeout=None)
+        return Response(data)